@@ -1,6 +1,15 @@
-import sqlite3
-from fastapi import FastAPI, HTTPException
-import json
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from collections.abc import AsyncIterator
+from typing import Annotated
+
+import aiosqlite
+import orjson
+from cachetools import TTLCache
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
 
 
 # ========================================
@@ -23,8 +32,8 @@ import json
 #   PATCH  /SetEnergy/{user_id}?value=                — установить энергию (0–100, абсолют)
 #   PATCH  /SetMood/{user_id}?value=                    — установить настроение (0–100, абсолют)
 #   PATCH  /SetStates/{user_id}  body: {"ключ": "значение", ...}               1  — полностью заменить все состояния
-#   PATCH  /AddPetItem/{user_id}?item=              — добавить предмет в инвентарь питомца
-#   DELETE /RemovePetItem/{user_id}?item=            — удалить предмет из инвентаря питомца
+#   PATCH  /AddPetItem/{user_id}?item=              — надеть аксессуар (finance/gaming/weather) на питомца
+#   DELETE /RemovePetItem/{user_id}?item=            — снять аксессуар с питомца
 #   PATCH  /AddUserItem/{user_id}?item=              — добавить предмет в инвентарь пользователя
 #   DELETE /RemoveUserItem/{user_id}?item=            — удалить предмет из инвентаря пользователя
 
@@ -38,353 +47,657 @@ import json
 #   GET    /GetAllUserIDByEnergyUnderN?n=            — user_id у кого энергия < n
 #   GET    /GetAllUserIDByMoodUnderN?n=              — user_id у кого настроение < n
 
-# ========================================
-
+#   POST   /BatchAllMinus?n=                         — вычесть n от денег у всех питомцев (одна транзакция)
+#   POST   /batch  body: {"requests": [{"id": "1", "op": "GetMoney", "user_id": "..."}, ...]}
+#                                                    — несколько операций одной транзакцией (ops: BATCH_OPS)
 
-app = FastAPI()
-
-conn = sqlite3.connect("pets.db", check_same_thread=False)
-conn.row_factory = sqlite3.Row
-cur = conn.cursor()
+# ========================================
 
 
-@app.post("/PostCreatePet/{user_id}", status_code=201)
-def createPet(user_id: str, name: str):
+DB_PATH = "pets.db"
+
+# Размер кэша подготовленных выражений sqlite3 на подключение
+CACHED_STATEMENTS = 256
+
+# Сколько строк скана читается из SQLite и отправляется клиенту за один шаг
+SCAN_CHUNK_ROWS = 256
+
+# Число подключений-читателей в пуле
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+
+_SCALAR_COLUMNS = ("money", "name", "satiety", "energy", "mood", "states")
+_STAT_COLUMNS = ("money", "satiety", "energy", "mood")
+_LOW_STAT_COLUMNS = ("satiety", "energy", "mood")
+
+# Аксессуары — те же, что в bot.py (_ITEM_BITS): инвентарь пользователя хранится
+# битовой маской user_inv_mask, надетый аксессуар (он всегда один) — в pet_inv_item
+ITEM_BITS = {"finance": 1, "gaming": 2, "weather": 4}
+
+# Порог частичных индексов idx_low_*: сканы с n <= порога читают только «голодных» питомцев
+LOW_STAT_THRESHOLD = 50
+
+# Все SQL-выражения контроллера. Один и тот же текст на каждый вызов —
+# sqlite3 берёт уже скомпилированное выражение из кэша подключения.
+STMTS = {
+    "get_pet": "SELECT * FROM pets WHERE user_id = ?",
+    **{f"get_{col}": f"SELECT {col} FROM pets WHERE user_id = ?" for col in _SCALAR_COLUMNS},
+    "pet_exists": "SELECT 1 FROM pets WHERE user_id = ? LIMIT 1",
+    "create_pet": "INSERT INTO pets (user_id, name) VALUES (?, ?) ON CONFLICT (user_id) DO NOTHING RETURNING *",
+    "delete_pet": "DELETE FROM pets WHERE user_id = ? RETURNING user_id",
+    # RETURNING: проверка существования, запись и чтение результата — одно выражение
+    **{f"set_{col}": f"UPDATE pets SET {col} = ? WHERE user_id = ? RETURNING {col}" for col in _SCALAR_COLUMNS},
+    "money_minus": "UPDATE pets SET money = MAX(0, money - ?) WHERE user_id = ? RETURNING money",
+    "all_money_minus": "UPDATE pets SET money = MAX(0, money - ?)",
+    **{
+        f"{col}_minus": f"UPDATE pets SET {col} = MAX(0, MIN(100, {col} - ?)) WHERE user_id = ? RETURNING {col}"
+        for col in ("satiety", "energy", "mood")
+    },
+    # Инвентарь — те же колонки, что пишет бот: одно выражение на операцию
+    "set_pet_item": "UPDATE pets SET pet_inv_item = ? WHERE user_id = ? RETURNING pet_inv_item",
+    "remove_pet_item": "UPDATE pets SET pet_inv_item = NULL WHERE user_id = ?2 AND pet_inv_item = ?1 "
+                       "RETURNING pet_inv_item",
+    "add_user_item": "UPDATE pets SET user_inv_mask = user_inv_mask | ? WHERE user_id = ? "
+                     "RETURNING user_inv_mask",
+    "remove_user_item": "UPDATE pets SET user_inv_mask = user_inv_mask & ~?1 "
+                        "WHERE user_id = ?2 AND user_inv_mask & ?1 RETURNING user_inv_mask",
+}
+
+
+# Скан -> колонки ключа страницы (порядок ORDER BY)
+SCAN_KEYS: dict[str, tuple] = {}
+
+
+def _scan_stmts(name: str, col: str, where: str, key: tuple) -> dict:
+    """Выражения постраничного скана: первая страница и следующие после ключа последней строки."""
+    SCAN_KEYS[name] = key
+    order = ", ".join(key)
+    marks = ", ".join("?" * len(key))
+    select = f"SELECT user_id, {col} FROM pets WHERE {where}"
+    return {
+        name: f"{select} ORDER BY {order} LIMIT ?",
+        f"{name}_next": f"{select} AND ({order}) > ({marks}) ORDER BY {order} LIMIT ?",
+    }
+
+
+# Сканы /GetAllUserIDBy*UnderN читаются страницами по ключу (keyset): каждая страница —
+# отдельный запрос, и читатель возвращается в пул до отправки её клиенту.
+# Индексные сканы идут по порядку индекса (col, user_id) — в WITHOUT ROWID индекс
+# содержит и user_id, страница начинается поиском по индексу. Для сытости/энергии/настроения
+# при n > LOW_STAT_THRESHOLD индекса нет, и скан идёт по первичному ключу user_id
+STMTS.update(_scan_stmts("money_under_n", "money", "money < ?", ("money", "user_id")))
+for _col in _LOW_STAT_COLUMNS:
+    STMTS.update(_scan_stmts(f"{_col}_under_n", _col, f"{_col} < ?", ("user_id",)))
+    # Литерал в WHERE нужен планировщику, чтобы выбрать частичный индекс idx_low_{col}
+    STMTS.update(_scan_stmts(f"{_col}_under_n_low", _col, f"{_col} < ? AND {_col} < {LOW_STAT_THRESHOLD}",
+                             (_col, "user_id")))
+
+# Операции для /batch: op -> (выражение из STMTS, параметр запроса или None, поле ответа)
+BATCH_OPS = {
+    **{f"Get{col.capitalize()}": (f"get_{col}", None, col) for col in ("money", "name", "satiety", "energy", "mood")},
+    "SetMoney": ("set_money", "amount", "money"),
+    **{f"All{col.capitalize()}Minus": (f"{col}_minus", "n", col) for col in _STAT_COLUMNS},
+}
+
+# Ограничения входных параметров проверяет FastAPI до обращения к БД (ответ 422)
+StatValue = Annotated[int, Query(ge=0, le=100)]
+PetName = Annotated[str, Query(max_length=15)]
+
+# Строки pets по user_id для GET-эндпоинтов; каждый мутатор сбрасывает свою запись (invalidate_pet).
+# Кэш свой у каждого воркера uvicorn: запись через другой воркер видна не позже чем через ttl
+PET_CACHE = TTLCache(maxsize=10_000, ttl=2.0)
+
+# Промахи кэша, чей SELECT ещё выполняется: user_id -> [число читателей, поколение].
+# Запись, сброшенная во время такого SELECT, поднимает поколение, и читатель
+# не кладёт в кэш строку, прочитанную до записи. _CACHE_EPOCH — то же для clear()
+_PET_INFLIGHT: dict[str, list[int]] = {}
+_CACHE_EPOCH = 0
+
+# WAL + synchronous=NORMAL: один fsync на чекпоинт, а не на каждый commit
+STARTUP_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+    # bot.py и tasks.py пишут в ту же БД: при занятой блокировке SQLite
+    # сам ждёт до 5 с вместо мгновенного SQLITE_BUSY
+    "PRAGMA busy_timeout=5000",
+)
+
+# user_id — PRIMARY KEY и уже проиндексирован; индексы нужны сканам /GetAllUserIDBy*UnderN.
+# money — обычный индекс (n бывает любым); сытость/энергия/настроение — частичные,
+# в них попадают только низкие значения, и почасовой расход не переписывает весь индекс
+STARTUP_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_pets_money ON pets(money)",
+    *(f"DROP INDEX IF EXISTS idx_pets_{col}" for col in _LOW_STAT_COLUMNS),
+    *(
+        f"CREATE INDEX IF NOT EXISTS idx_low_{col} ON pets({col}) WHERE {col} < {LOW_STAT_THRESHOLD}"
+        for col in _LOW_STAT_COLUMNS
+    ),
+)
+
+
+class ConnectionPool:
+    """
+    Пул подключений SQLite: N читателей (PRAGMA query_only) и один писатель.
+    Читатели в WAL не ждут писателя; записи SQLite всё равно сериализует,
+    поэтому писатель один и выдаётся под asyncio.Lock.
+    """
+
+    def __init__(self, path: str, readers: int):
+        self.path = path
+        self.size = readers
+        self._writer: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+        self._readers: asyncio.Queue = asyncio.Queue()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        # isolation_level=None: одиночные выражения коммитятся сами,
+        # многошаговые операции явно открывают BEGIN IMMEDIATE через transaction().
+        # row_factory не задаётся: строки — кортежи, одиночные колонки читаются как row[0]
+        db = await aiosqlite.connect(self.path, cached_statements=CACHED_STATEMENTS, isolation_level=None)
+        for pragma in STARTUP_PRAGMAS:
+            await db.execute(pragma)
+        return db
+
+    async def open(self) -> None:
+        self._writer = await self._connect()
+        for index in STARTUP_INDEXES:
+            await self._writer.execute(index)
+        for _ in range(self.size):
+            reader = await self._connect()
+            await reader.execute("PRAGMA query_only=1")
+            self._readers.put_nowait(reader)
+
+    async def close(self) -> None:
+        while not self._readers.empty():
+            await self._readers.get_nowait().close()
+        if self._writer:
+            await self._writer.close()
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Взять читателя из пула на время блока."""
+        db = await self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Эксклюзивный доступ к подключению-писателю."""
+        async with self._write_lock:
+            yield self._writer
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Группирует несколько выражений в одну транзакцию (один fsync на COMMIT)."""
+        async with self.writer() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                await db.execute("ROLLBACK")
+                raise
+            await db.execute("COMMIT")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Открывает пул подключений к БД на время жизни приложения."""
+    pool = ConnectionPool(DB_PATH, READ_POOL_SIZE)
+    await pool.open()
+    app.state.db_pool = pool
+    try:
+        yield
+    finally:
+        await pool.close()
+
+
+# GET-обработчики возвращают ORJSONResponse напрямую (response_model=None):
+# FastAPI не прогоняет такой ответ через jsonable_encoder
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+
+async def get_pool(request: Request) -> ConnectionPool:
+    """Зависимость: пул подключений, открытый в lifespan."""
+    return request.app.state.db_pool
+
+
+def row_to_dict(cur: aiosqlite.Cursor, row: tuple) -> dict:
+    """Кортеж строки -> dict по именам колонок курсора (только для SELECT */RETURNING *)."""
+    return dict(zip((col[0] for col in cur.description), row))
+
+
+def item_bit(item: str) -> int:
+    """Бит аксессуара в user_inv_mask; неизвестный предмет — 400."""
+    bit = ITEM_BITS.get(item)
+    if bit is None:
+        raise HTTPException(status_code=400, detail=f"Неизвестный предмет '{item}'")
+    return bit
+
+
+def mask_items(mask: int) -> list:
+    """Маска user_inv_mask -> список аксессуаров."""
+    return [item for item, bit in ITEM_BITS.items() if mask & bit]
+
+
+def invalidate_pet(user_id: str) -> None:
+    """Сбросить запись PET_CACHE после изменения питомца."""
+    PET_CACHE.pop(user_id, None)
+    slot = _PET_INFLIGHT.get(user_id)
+    if slot is not None:
+        slot[1] += 1
+
+
+def invalidate_all_pets() -> None:
+    """Сбросить весь PET_CACHE после массового изменения."""
+    global _CACHE_EPOCH
+    PET_CACHE.clear()
+    _CACHE_EPOCH += 1
+
+
+async def get_cached_pet(pool: ConnectionPool, user_id: str) -> dict | None:
+    """Строка питомца из PET_CACHE, при промахе — из БД. Все GET-поля берутся отсюда."""
+    pet = PET_CACHE.get(user_id)
+    if pet is not None:
+        return pet
+    slot = _PET_INFLIGHT.setdefault(user_id, [0, 0])
+    slot[0] += 1
+    generation, epoch = slot[1], _CACHE_EPOCH
+    try:
+        async with pool.reader() as db, db.execute(STMTS["get_pet"], (user_id,)) as cur:
+            row = await cur.fetchone()
+            if not row:
+                return None
+            pet = row_to_dict(cur, row)
+        # Пока шёл SELECT, питомца могли изменить: тогда строка уже устарела
+        if slot[1] == generation and _CACHE_EPOCH == epoch:
+            PET_CACHE[user_id] = pet
+        return pet
+    finally:
+        slot[0] -= 1
+        if not slot[0]:
+            del _PET_INFLIGHT[user_id]
+
+
+@app.post("/PostCreatePet/{user_id}", status_code=201, response_model=None)
+async def createPet(user_id: str, name: str, pool: ConnectionPool = Depends(get_pool)) -> dict:
 
     """Создать питомца. Если питомец уже существует — вернёт 409."""
-    cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-    if cur.fetchone():
-        raise HTTPException(status_code=409, detail="Питомец уже существует")
-    cur.execute("INSERT INTO pets (user_id, name) VALUES (?, ?)", (user_id, name))
-    conn.commit()
-    cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-    return dict(cur.fetchone())
+    async with pool.writer() as db, db.execute(STMTS["create_pet"], (user_id, name)) as cur:
+        row = await cur.fetchone()
+        if not row:
+            raise HTTPException(status_code=409, detail="Питомец уже существует")
+        return row_to_dict(cur, row)
 
 @app.delete("/DeletePetBy/{user_id}", status_code=204)
-def deletePetByUserId(user_id: str):
+async def deletePetByUserId(user_id: str, pool: ConnectionPool = Depends(get_pool)) -> None:
 
     """Удалить питомца по user_id. Если питомец не найден — вернёт 404."""
 
-    cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-    if not cur.fetchone():
+    async with pool.writer() as db, db.execute(STMTS["delete_pet"], (user_id,)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    cur.execute("DELETE FROM pets WHERE user_id = ?", (user_id,))
-    conn.commit()
 
-@app.get("/GetPetBy/{user_id}")
-def getPetByUserId(user_id: str):
+@app.get("/GetPetBy/{user_id}", response_model=None)
+async def getPetByUserId(user_id: str, pool: ConnectionPool = Depends(get_pool)) -> ORJSONResponse:
 
     """Получить все данные питомца по user_id."""
 
-    cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    row = await get_cached_pet(pool, user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    return dict(row)
+    return ORJSONResponse(row)
 
 # ==================== MONEY ====================
 
-@app.get("/GetMoney/{user_id}")
-def getMoney(user_id: str):
+@app.get("/GetMoney/{user_id}", response_model=None)
+async def getMoney(user_id: str, pool: ConnectionPool = Depends(get_pool)) -> ORJSONResponse:
     """Получить баланс денег питомца."""
-    cur.execute("SELECT money FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    row = await get_cached_pet(pool, user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    return {"money": row["money"]}
+    return ORJSONResponse({"money": row["money"]})
 
-@app.patch("/SetMoney/{user_id}")
-def setMoney(user_id: str, amount: int):
+@app.patch("/SetMoney/{user_id}", response_model=None)
+async def setMoney(user_id: str, amount: int, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Установить деньги (абсолютное значение)."""
-    cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-    if not cur.fetchone():
+    async with pool.writer() as db, db.execute(STMTS["set_money"], (amount, user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    cur.execute("UPDATE pets SET money = ? WHERE user_id = ?", (amount, user_id))
-    conn.commit()
-    cur.execute("SELECT money FROM pets WHERE user_id = ?", (user_id,))
-    return {"money": cur.fetchone()["money"]}
+    return {"money": row[0]}
 
 
 
 
 # ==================== NAME ====================
 
-@app.get("/GetName/{user_id}")
-def getName(user_id: str):
+@app.get("/GetName/{user_id}", response_model=None)
+async def getName(user_id: str, pool: ConnectionPool = Depends(get_pool)) -> ORJSONResponse:
     """Получить имя питомца."""
-    cur.execute("SELECT name FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    row = await get_cached_pet(pool, user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    return {"name": row["name"]}
+    return ORJSONResponse({"name": row["name"]})
 
-@app.patch("/SetName/{user_id}")
-def setName(user_id: str, name: str):
+@app.patch("/SetName/{user_id}", response_model=None)
+async def setName(user_id: str, name: PetName, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Изменить имя питомца (макс. 15 символов)."""
-    if len(name) > 15:
-        raise HTTPException(status_code=400, detail="Имя не должно превышать 15 символов")
-    cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-    if not cur.fetchone():
+    async with pool.writer() as db, db.execute(STMTS["set_name"], (name, user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    cur.execute("UPDATE pets SET name = ? WHERE user_id = ?", (name, user_id))
-    conn.commit()
-    return {"name": name}
+    return {"name": row[0]}
 
 
 # ==================== SATIETY ====================
 
-@app.get("/GetSatiety/{user_id}")
-def getSatiety(user_id: str):
+@app.get("/GetSatiety/{user_id}", response_model=None)
+async def getSatiety(user_id: str, pool: ConnectionPool = Depends(get_pool)) -> ORJSONResponse:
     """Получить сытость питомца."""
-    cur.execute("SELECT satiety FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    row = await get_cached_pet(pool, user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    return {"satiety": row["satiety"]}
+    return ORJSONResponse({"satiety": row["satiety"]})
 
-@app.patch("/SetSatiety/{user_id}")
-def setSatiety(user_id: str, value: int):
+@app.patch("/SetSatiety/{user_id}", response_model=None)
+async def setSatiety(user_id: str, value: StatValue, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Установить сытость (0–100)."""
-    if not (0 <= value <= 100):
-        raise HTTPException(status_code=400, detail="Значение должно быть от 0 до 100")
-    cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-    if not cur.fetchone():
+    async with pool.writer() as db, db.execute(STMTS["set_satiety"], (value, user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    cur.execute("UPDATE pets SET satiety = ? WHERE user_id = ?", (value, user_id))
-    conn.commit()
-    return {"satiety": value}
+    return {"satiety": row[0]}
 
 
 
 # ==================== ENERGY ====================
 
-@app.get("/GetEnergy/{user_id}")
-def getEnergy(user_id: str):
+@app.get("/GetEnergy/{user_id}", response_model=None)
+async def getEnergy(user_id: str, pool: ConnectionPool = Depends(get_pool)) -> ORJSONResponse:
     """Получить энергию питомца."""
-    cur.execute("SELECT energy FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    row = await get_cached_pet(pool, user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    return {"energy": row["energy"]}
+    return ORJSONResponse({"energy": row["energy"]})
 
-@app.patch("/SetEnergy/{user_id}")
-def setEnergy(user_id: str, value: int):
+@app.patch("/SetEnergy/{user_id}", response_model=None)
+async def setEnergy(user_id: str, value: StatValue, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Установить энергию (0–100)."""
-    if not (0 <= value <= 100):
-        raise HTTPException(status_code=400, detail="Значение должно быть от 0 до 100")
-    cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-    if not cur.fetchone():
+    async with pool.writer() as db, db.execute(STMTS["set_energy"], (value, user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    cur.execute("UPDATE pets SET energy = ? WHERE user_id = ?", (value, user_id))
-    conn.commit()
-    return {"energy": value}
+    return {"energy": row[0]}
 
 
 
 
 # ==================== MOOD ====================
 
-@app.get("/GetMood/{user_id}")
-def getMood(user_id: str):
+@app.get("/GetMood/{user_id}", response_model=None)
+async def getMood(user_id: str, pool: ConnectionPool = Depends(get_pool)) -> ORJSONResponse:
     """Получить настроение питомца."""
-    cur.execute("SELECT mood FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    row = await get_cached_pet(pool, user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    return {"mood": row["mood"]}
+    return ORJSONResponse({"mood": row["mood"]})
 
-@app.patch("/SetMood/{user_id}")
-def setMood(user_id: str, value: int):
+@app.patch("/SetMood/{user_id}", response_model=None)
+async def setMood(user_id: str, value: StatValue, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Установить настроение (0–100)."""
-    if not (0 <= value <= 100):
-        raise HTTPException(status_code=400, detail="Значение должно быть от 0 до 100")
-    cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-    if not cur.fetchone():
+    async with pool.writer() as db, db.execute(STMTS["set_mood"], (value, user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    cur.execute("UPDATE pets SET mood = ? WHERE user_id = ?", (value, user_id))
-    conn.commit()
-    return {"mood": value}
+    return {"mood": row[0]}
 
 
 
 
 # ==================== STATES (JSON) ====================
 
-@app.get("/GetStates/{user_id}")
-def getStates(user_id: str):
+@app.get("/GetStates/{user_id}", response_model=None)
+async def getStates(user_id: str, pool: ConnectionPool = Depends(get_pool)) -> ORJSONResponse:
     """Получить состояния питомца."""
-    cur.execute("SELECT states FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    row = await get_cached_pet(pool, user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    return {"states": json.loads(row["states"]) if row["states"] else None}
+    return ORJSONResponse({"states": orjson.loads(row["states"]) if row["states"] else None})
 
-@app.patch("/SetStates/{user_id}")
-def setStates(user_id: str, states: dict):
+@app.patch("/SetStates/{user_id}", response_model=None)
+async def setStates(user_id: str, states: dict, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Полностью заменить состояния питомца."""
-    cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-    if not cur.fetchone():
+    async with pool.writer() as db, db.execute(STMTS["set_states"], (orjson.dumps(states).decode(), user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    cur.execute("UPDATE pets SET states = ? WHERE user_id = ?", (json.dumps(states), user_id))
-    conn.commit()
     return {"states": states}
 
 
 
 
-# ==================== PET INVENTORY (JSON) ====================
+# ==================== PET INVENTORY ====================
 
-@app.get("/GetPetInventory/{user_id}")
-def getPetInventory(user_id: str):
-    """Получить инвентарь питомца."""
-    cur.execute("SELECT PetInventory FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+@app.get("/GetPetInventory/{user_id}", response_model=None)
+async def getPetInventory(user_id: str, pool: ConnectionPool = Depends(get_pool)) -> ORJSONResponse:
+    """Получить инвентарь питомца (надетый аксессуар)."""
+    row = await get_cached_pet(pool, user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    return {"PetInventory": json.loads(row["PetInventory"]) if row["PetInventory"] else None}
-
-@app.patch("/AddPetItem/{user_id}")
-def addPetItem(user_id: str, item: str):
-    """Добавить предмет в инвентарь питомца."""
-    cur.execute("SELECT PetInventory FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    return ORJSONResponse({"PetInventory": [row["pet_inv_item"]] if row["pet_inv_item"] else None})
+
+@app.patch("/AddPetItem/{user_id}", response_model=None)
+async def addPetItem(user_id: str, item: str, pool: ConnectionPool = Depends(get_pool)) -> dict:
+    """Надеть аксессуар на питомца (заменяет надетый)."""
+    item_bit(item)
+    async with pool.writer() as db, db.execute(STMTS["set_pet_item"], (item, user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    inventory = json.loads(row["PetInventory"]) if row["PetInventory"] else []
-    inventory.append(item)
-    cur.execute("UPDATE pets SET PetInventory = ? WHERE user_id = ?", (json.dumps(inventory), user_id))
-    conn.commit()
-    return {"PetInventory": inventory}
-
-@app.delete("/RemovePetItem/{user_id}")
-def removePetItem(user_id: str, item: str):
-    """Удалить предмет из инвентаря питомца."""
-    cur.execute("SELECT PetInventory FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    return {"PetInventory": [row[0]]}
+
+@app.delete("/RemovePetItem/{user_id}", response_model=None)
+async def removePetItem(user_id: str, item: str, pool: ConnectionPool = Depends(get_pool)) -> dict:
+    """Снять аксессуар с питомца."""
+    item_bit(item)
+    async with pool.writer() as db, db.execute(STMTS["remove_pet_item"], (item, user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
     if not row:
-        raise HTTPException(status_code=404, detail="Питомец не найден")
-    inventory = json.loads(row["PetInventory"]) if row["PetInventory"] else []
-    if item not in inventory:
+        # Ничего не обновилось: либо нет питомца, либо предмет не надет
+        async with pool.reader() as db, db.execute(STMTS["pet_exists"], (user_id,)) as cur:
+            if not await cur.fetchone():
+                raise HTTPException(status_code=404, detail="Питомец не найден")
         raise HTTPException(status_code=404, detail=f"Предмет '{item}' не найден в инвентаре")
-    inventory.remove(item)
-    cur.execute("UPDATE pets SET PetInventory = ? WHERE user_id = ?", (json.dumps(inventory) if inventory else None, user_id))
-    conn.commit()
-    return {"PetInventory": inventory}
+    return {"PetInventory": []}
 
 
-# ==================== USER INVENTORY (JSON) ====================
+# ==================== USER INVENTORY ====================
 
-@app.get("/GetUserInventory/{user_id}")
-def getUserInventory(user_id: str):
+@app.get("/GetUserInventory/{user_id}", response_model=None)
+async def getUserInventory(user_id: str, pool: ConnectionPool = Depends(get_pool)) -> ORJSONResponse:
     """Получить инвентарь пользователя."""
-    cur.execute("SELECT UserInventory FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    row = await get_cached_pet(pool, user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    return {"UserInventory": json.loads(row["UserInventory"]) if row["UserInventory"] else None}
+    return ORJSONResponse({"UserInventory": mask_items(row["user_inv_mask"]) or None})
 
-@app.patch("/AddUserItem/{user_id}")
-def addUserItem(user_id: str, item: str):
+@app.patch("/AddUserItem/{user_id}", response_model=None)
+async def addUserItem(user_id: str, item: str, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Добавить предмет в инвентарь пользователя."""
-    cur.execute("SELECT UserInventory FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    async with pool.writer() as db, db.execute(STMTS["add_user_item"], (item_bit(item), user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    inventory = json.loads(row["UserInventory"]) if row["UserInventory"] else []
-    inventory.append(item)
-    cur.execute("UPDATE pets SET UserInventory = ? WHERE user_id = ?", (json.dumps(inventory), user_id))
-    conn.commit()
-    return {"UserInventory": inventory}
-
-@app.delete("/RemoveUserItem/{user_id}")
-def removeUserItem(user_id: str, item: str):
+    return {"UserInventory": mask_items(row[0])}
+
+@app.delete("/RemoveUserItem/{user_id}", response_model=None)
+async def removeUserItem(user_id: str, item: str, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Удалить предмет из инвентаря пользователя."""
-    cur.execute("SELECT UserInventory FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    async with pool.writer() as db, db.execute(STMTS["remove_user_item"], (item_bit(item), user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
     if not row:
-        raise HTTPException(status_code=404, detail="Питомец не найден")
-    inventory = json.loads(row["UserInventory"]) if row["UserInventory"] else []
-    if item not in inventory:
+        # Ничего не обновилось: либо нет питомца, либо нет предмета
+        async with pool.reader() as db, db.execute(STMTS["pet_exists"], (user_id,)) as cur:
+            if not await cur.fetchone():
+                raise HTTPException(status_code=404, detail="Питомец не найден")
         raise HTTPException(status_code=404, detail=f"Предмет '{item}' не найден в инвентаре")
-    inventory.remove(item)
-    cur.execute("UPDATE pets SET UserInventory = ? WHERE user_id = ?", (json.dumps(inventory) if inventory else None, user_id))
-    conn.commit()
-    return {"UserInventory": inventory}
-
+    return {"UserInventory": mask_items(row[0])}
+
+
+def stream_users(pool: ConnectionPool, stmt: str, col: str, n: int) -> StreamingResponse:
+    """Отдать {"users": [...]} потоком: строки уходят клиенту пачками по SCAN_CHUNK_ROWS.
+    Читатель берётся из пула только на чтение страницы — медленный клиент его не держит."""
+    # Позиции колонок ключа в строке (user_id, col)
+    key_pos = [0 if name == "user_id" else 1 for name in SCAN_KEYS[stmt]]
+
+    async def body() -> AsyncIterator[bytes]:
+        yield b'{"users":['
+        sql, args = STMTS[stmt], (n, SCAN_CHUNK_ROWS)
+        sep = b""
+        while True:
+            async with pool.reader() as db, db.execute(sql, args) as cur:
+                rows = await cur.fetchall()
+            if not rows:
+                break
+            yield sep + b",".join(orjson.dumps({"user_id": row[0], col: row[1]}) for row in rows)
+            sep = b","
+            if len(rows) < SCAN_CHUNK_ROWS:
+                break
+            last = rows[-1]
+            sql = STMTS[f"{stmt}_next"]
+            args = (n, *(last[i] for i in key_pos), SCAN_CHUNK_ROWS)
+        yield b"]}"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+def under_n_stmt(col: str, n: int) -> str:
+    """Ключ STMTS для скана «{col} < n»: при малом n — через частичный индекс."""
+    return f"{col}_under_n_low" if n <= LOW_STAT_THRESHOLD else f"{col}_under_n"
 
 @app.get("/GetAllUserIDByMoneyUnderN")
-def getAllUserIDByMoneyUnderN(n: int):
+async def getAllUserIDByMoneyUnderN(n: int, pool: ConnectionPool = Depends(get_pool)) -> StreamingResponse:
     """Получить user_id всех у кого деньги меньше N."""
-    cur.execute("SELECT user_id, money FROM pets WHERE money < ?", (n,))
-    rows = cur.fetchall()
-    return {"users": [dict(row) for row in rows]}
+    return stream_users(pool, "money_under_n", "money", n)
 
 @app.get("/GetAllUserIDBySatietyUnderN")
-def getAllUserIDBySatietyUnderN(n: int):
+async def getAllUserIDBySatietyUnderN(n: int, pool: ConnectionPool = Depends(get_pool)) -> StreamingResponse:
     """Получить user_id всех у кого сытость меньше N."""
-    cur.execute("SELECT user_id, satiety FROM pets WHERE satiety < ?", (n,))
-    rows = cur.fetchall()
-    return {"users": [dict(row) for row in rows]}
+    return stream_users(pool, under_n_stmt("satiety", n), "satiety", n)
 
 @app.get("/GetAllUserIDByEnergyUnderN")
-def getAllUserIDByEnergyUnderN(n: int):
+async def getAllUserIDByEnergyUnderN(n: int, pool: ConnectionPool = Depends(get_pool)) -> StreamingResponse:
     """Получить user_id всех у кого энергия меньше N."""
-    cur.execute("SELECT user_id, energy FROM pets WHERE energy < ?", (n,))
-    rows = cur.fetchall()
-    return {"users": [dict(row) for row in rows]}
+    return stream_users(pool, under_n_stmt("energy", n), "energy", n)
 
 @app.get("/GetAllUserIDByMoodUnderN")
-def getAllUserIDByMoodUnderN(n: int):
+async def getAllUserIDByMoodUnderN(n: int, pool: ConnectionPool = Depends(get_pool)) -> StreamingResponse:
     """Получить user_id всех у кого настроение меньше N."""
-    cur.execute("SELECT user_id, mood FROM pets WHERE mood < ?", (n,))
-    rows = cur.fetchall()
-    return {"users": [dict(row) for row in rows]}\
-    
-@app.patch("/AllMoneyMinus/{user_id}")
-def allMoneyMinus(user_id: str, n: int):
+    return stream_users(pool, under_n_stmt("mood", n), "mood", n)
+
+@app.patch("/AllMoneyMinus/{user_id}", response_model=None)
+async def allMoneyMinus(user_id: str, n: int, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Вычесть n от денег (не уйдёт ниже 0)."""
-    cur.execute("SELECT money FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    # Autocommit: блокировка записи держится ровно на одно выражение UPDATE ... RETURNING
+    async with pool.writer() as db, db.execute(STMTS["money_minus"], (n, user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    new_value = max(0, row["money"] - n)
-    cur.execute("UPDATE pets SET money = ? WHERE user_id = ?", (new_value, user_id))
-    conn.commit()
-    return {"money": new_value}
+    return {"money": row[0]}
 
-@app.patch("/AllSatietyMinus/{user_id}")
-def allSatietyMinus(user_id: str, n: int):
+@app.patch("/AllSatietyMinus/{user_id}", response_model=None)
+async def allSatietyMinus(user_id: str, n: int, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Вычесть n от сытости (clamp 0–100)."""
-    cur.execute("SELECT satiety FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    async with pool.writer() as db, db.execute(STMTS["satiety_minus"], (n, user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    new_value = max(0, min(100, row["satiety"] - n))
-    cur.execute("UPDATE pets SET satiety = ? WHERE user_id = ?", (new_value, user_id))
-    conn.commit()
-    return {"satiety": new_value}
+    return {"satiety": row[0]}
 
-@app.patch("/AllEnergyMinus/{user_id}")
-def allEnergyMinus(user_id: str, n: int):
+@app.patch("/AllEnergyMinus/{user_id}", response_model=None)
+async def allEnergyMinus(user_id: str, n: int, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Вычесть n от энергии (clamp 0–100)."""
-    cur.execute("SELECT energy FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    async with pool.writer() as db, db.execute(STMTS["energy_minus"], (n, user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    new_value = max(0, min(100, row["energy"] - n))
-    cur.execute("UPDATE pets SET energy = ? WHERE user_id = ?", (new_value, user_id))
-    conn.commit()
-    return {"energy": new_value}
+    return {"energy": row[0]}
 
-@app.patch("/AllMoodMinus/{user_id}")
-def allMoodMinus(user_id: str, n: int):
+@app.patch("/AllMoodMinus/{user_id}", response_model=None)
+async def allMoodMinus(user_id: str, n: int, pool: ConnectionPool = Depends(get_pool)) -> dict:
     """Вычесть n от настроения (clamp 0–100)."""
-    cur.execute("SELECT mood FROM pets WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    async with pool.writer() as db, db.execute(STMTS["mood_minus"], (n, user_id)) as cur:
+        row = await cur.fetchone()
+    invalidate_pet(user_id)
     if not row:
         raise HTTPException(status_code=404, detail="Питомец не найден")
-    new_value = max(0, min(100, row["mood"] - n))
-    cur.execute("UPDATE pets SET mood = ? WHERE user_id = ?", (new_value, user_id))
-    conn.commit()
-    return {"mood": new_value}
-
+    return {"mood": row[0]}
+
+@app.post("/BatchAllMinus", response_model=None)
+async def batchAllMinus(n: int, pool: ConnectionPool = Depends(get_pool)) -> dict:
+    """Вычесть n от денег у всех питомцев (не уйдёт ниже 0) одной транзакцией."""
+    async with pool.transaction() as db:
+        async with db.execute(STMTS["all_money_minus"], (n,)) as cur:
+            updated = cur.rowcount
+    invalidate_all_pets()
+    return {"updated": updated}
+
+
+class BatchItem(BaseModel):
+    id: str | None = None
+    op: str
+    user_id: str
+    n: int | None = None
+    amount: int | None = None
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem]
+
+
+async def _run_batch_item(db: aiosqlite.Connection, item: BatchItem) -> dict:
+    """Выполнить одну операцию /batch на уже открытой транзакции."""
+    spec = BATCH_OPS.get(item.op)
+    if spec is None:
+        return {"id": item.id, "status": 400, "body": {"detail": f"Неизвестная операция '{item.op}'"}}
+    stmt, param, field = spec
+    if param is None:
+        args = (item.user_id,)
+    elif getattr(item, param) is None:
+        return {"id": item.id, "status": 400, "body": {"detail": f"Не передан параметр '{param}'"}}
+    else:
+        args = (getattr(item, param), item.user_id)
+    async with db.execute(STMTS[stmt], args) as cur:
+        row = await cur.fetchone()
+    if not row:
+        return {"id": item.id, "status": 404, "body": {"detail": "Питомец не найден"}}
+    return {"id": item.id, "status": 200, "body": {field: row[0]}}
+
+
+@app.post("/batch", response_model=None)
+async def batch(body: BatchRequest, pool: ConnectionPool = Depends(get_pool)) -> dict:
+    """Выполнить несколько операций одной транзакцией; ответы в порядке запросов."""
+    async with pool.transaction() as db:
+        responses = [await _run_batch_item(db, item) for item in body.requests]
+    for item in body.requests:
+        if not item.op.startswith("Get"):
+            invalidate_pet(item.user_id)
+    return {"responses": responses}
@@ -7,18 +7,20 @@ AI: Groq API с эмоциональными реакциями
 Скрытые логи (только DEBUG)
 
 Зависимости:
-  pip install httpx beautifulsoup4 python-dotenv
+  pip install httpx lxml orjson python-dotenv
 """
 
 import re
-import json
+import asyncio
 import logging
 import os
 import random
+from collections import OrderedDict
 from dotenv import load_dotenv
 import httpx
-from bs4 import BeautifulSoup
-from typing import Set, List, Optional
+import orjson
+from lxml import html as lxml_html
+from typing import Dict, Set, List, Optional, Tuple
 from urllib.parse import urljoin
 
 # ── Загрузка .env ───────────────────────────────────────────────────────────
@@ -36,15 +38,27 @@ if GROQ_API_KEY:
 # ── Источники новостей ─────────────────────────────────────────────────────
 SOURCES = {
     "forbes": {
+        "label": "Forbes",
         "url": "https://www.forbes.ru/finansy/",
+        "base_url": "https://www.forbes.ru",
         "domain": "forbes.ru",
+        "browser": True,
+        "timeout": 25,
+        "min_len": 15,
+        # Только статьи из /news/ или /finansy/
+        "paths": ['/news/', '/finansy/'],
+        "ad_words": ['реклама', 'партнёр', 'спонсор', 'promo', 'подписка'],
         "keywords": ['финанс', 'экономика', 'банк', 'инвест', 'бизнес', 'компани',
                     'рынок', 'акции', 'доход', 'прибыль', 'кризис', 'курс',
                     'налог', 'бюджет', 'доллар', 'рубль', 'евро'],
     },
     "stopgame": {
+        "label": "StopGame",
         "url": "https://stopgame.ru/news",
+        "base_url": "https://stopgame.ru",
         "domain": "stopgame.ru",
+        "ignore": False,
+        "ad_words": ['реклама', 'vk.com', 't.me', 'youtube'],
     },
     "ria_finance": {
         "url": "https://ria.ru/",
@@ -62,220 +76,270 @@ SOURCES = {
     },
 }
 
+
+def _keyword_re(words: List[str]) -> "re.Pattern[str]":
+    """Одно регулярное выражение-альтернатива вместо N проверок `kw in text`"""
+    return re.compile("|".join(map(re.escape, words)))
+
+
+for _config in SOURCES.values():
+    if _config.get("keywords"):
+        _config["_kw_re"] = _keyword_re(_config["keywords"])
+
 # ── Погода: Ростов-на-Дону ─────────────────────────────────────────────────
 ROSTOV_LAT = 47.2357
 ROSTOV_LON = 39.7015
 WEATHER_API = "https://api.open-meteo.com/v1/forecast"
 
 # ── История уникальности ───────────────────────────────────────────────────
-_seen_news: Set[str] = set()
 MAX_SEEN = 200
 
+
+class _BloomHistory:
+    """
+    История заголовков на двух Bloom-фильтрах (bytearray фиксированного размера).
+    Заголовки не хранятся — только биты; поколение сменяется каждые MAX_SEEN
+    добавлений, поэтому помнятся последние MAX_SEEN..2*MAX_SEEN заголовков.
+    Ложные срабатывания (пропуск новой новости) крайне редки и допустимы.
+    """
+
+    BITS = 8 * 8192  # 8 КБ на поколение, 16 КБ всего
+    HASHES = 4
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        self._current = bytearray(self.BITS // 8)
+        self._previous = bytearray(self.BITS // 8)
+        self._count = 0
+
+    def _positions(self, item: str) -> List[int]:
+        # Двойное хеширование: две 32-битные половины hash() дают k позиций
+        h = hash(item) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.BITS for i in range(self.HASHES)]
+
+    @staticmethod
+    def _contains(bits: bytearray, positions: List[int]) -> bool:
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def add(self, item: str) -> bool:
+        """Добавляет заголовок; возвращает True, если он уже встречался"""
+        positions = self._positions(item)
+        if self._contains(self._current, positions):
+            return True
+        seen = self._contains(self._previous, positions)
+        # Заголовок из старого поколения переносится в текущее (как move_to_end в LRU)
+        for p in positions:
+            self._current[p >> 3] |= 1 << (p & 7)
+        self._count += 1
+        if self._count >= self.capacity:
+            self._previous, self._current = self._current, bytearray(self.BITS // 8)
+            self._count = 0
+        return seen
+
+
+_seen_news = _BloomHistory(MAX_SEEN)
+
 # ── Игнорируемые темы (военные) ────────────────────────────────────────────
 IGNORE_KEYWORDS = [
     'пво сбила', 'беспилотник сбит', 'воздушная тревога',
     'обстрел города', 'ракетный удар', 'спецоперация',
 ]
+_IGNORE_RE = _keyword_re(IGNORE_KEYWORDS)
 
 
-# ── Утилиты ────────────────────────────────────────────────────────────────
+# User-Agent клиента по умолчанию; Forbes получает браузерные заголовки поверх него
+_BOT_HEADERS = {"User-Agent": "Mozilla/5.0 TamagotchiBot/1.0"}
+_BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "ru-RU,ru;q=0.9",
+}
 
-def _should_ignore(title: str) -> bool:
-    """Проверяет, нужно ли игнорировать новость"""
-    t = title.lower()
-    return any(kw in t for kw in IGNORE_KEYWORDS)
 
+# ── Общий HTTP-клиент ──────────────────────────────────────────────────────
+# Один AsyncClient на все запросы модуля: keep-alive и HTTP/2 вместо нового
+# TCP/TLS-рукопожатия на каждый fetch. Клиент создаётся один раз в event loop
+# бота (он единственный) и живёт между нажатиями до close_http_client().
+_client: Optional[httpx.AsyncClient] = None
 
-def _is_duplicate(title: str) -> bool:
-    """Проверяет дубликаты"""
-    normalized = " ".join(title.lower().split())
-    if normalized in _seen_news:
-        return True
-    _seen_news.add(normalized)
-    if len(_seen_news) > MAX_SEEN:
-        _seen_news.pop()
-    return False
 
+def _get_client() -> httpx.AsyncClient:
+    """Возвращает общий AsyncClient (создаётся при первом запросе)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=25,
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=40, keepalive_expiry=300),
+            http2=True,
+            headers=_BOT_HEADERS,
+        )
+    return _client
 
-def _normalize_url(base: str, href: str) -> Optional[str]:
-    """Приводит URL к абсолютному"""
-    if not href:
-        return None
-    clean = href.split("?")[0].split("#")[0]
-    if clean.startswith("http"):
-        return clean
-    return urljoin(base, clean)
 
+async def close_http_client():
+    """Закрывает общий HTTP-клиент (вызывать при остановке бота)"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
 
-# ── ✅ Парсер Forbes.ru/finansy ────────────────────────────────────────────
 
-async def fetch_forbes(count: int) -> List[dict]:
-    """Парсит новости с Forbes.ru/finansy"""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "ru-RU,ru;q=0.9",
-    }
-    config = SOURCES["forbes"]
-    base_url = "https://www.forbes.ru"
-    
-    try:
-        async with httpx.AsyncClient(timeout=25, follow_redirects=True) as client:
-            r = await client.get(config["url"], headers=headers)
-            if r.status_code != 200:
-                return []
-            r.raise_for_status()
-    except Exception as e:
-        logger.debug(f"[Forbes] HTTP Error: {e}")
-        return []
-    
-    soup = BeautifulSoup(r.text, 'html.parser')
-    items = []
-    seen_urls: Set[str] = set()
-    
-    # Широкий поиск + фильтрация по URL
-    for a in soup.find_all("a", href=True, string=True):
-        if len(items) >= count:
-            break
-        
-        title = a.get_text(strip=True)
-        href = a["href"]
-        
-        # Базовые фильтры
-        if not title or len(title) < 15 or len(title) > 250:
-            continue
-        if _is_duplicate(title) or _should_ignore(title):
-            continue
-        if any(bad in title.lower() for bad in ['реклама', 'партнёр', 'спонсор', 'promo', 'подписка']):
-            continue
-        
-        url = _normalize_url(base_url, href)
-        if not url or config["domain"] not in url or url in seen_urls:
-            continue
-        # Только статьи из /news/ или /finansy/
-        if '/news/' not in url and '/finansy/' not in url:
-            continue
-        
-        # Фильтр по ключевым словам (финансы)
-        if config.get("keywords"):
-            text_lower = title.lower()
-            if not any(kw in text_lower for kw in config["keywords"]):
-                continue
-        
-        seen_urls.add(url)
-        items.append({"title": title, "url": url, "summary": "", "source": "forbes"})
-        logger.debug(f"[Forbes] ✅ {title[:50]}...")
-    
-    logger.info(f"[Forbes] Найдено: {len(items)} новостей")
-    return items[:count]
+# Условный GET: url -> (ETag, Last-Modified, ссылки страницы (title, href)).
+# На 304 Not Modified страница не скачивается и не парсится заново.
+_page_cache: Dict[str, Tuple[Optional[str], Optional[str], List[Tuple[str, str]]]] = {}
 
 
-# ── ✅ Парсер StopGame.ru ─────────────────────────────────────────────────
+# ── Утилиты ────────────────────────────────────────────────────────────────
 
-async def fetch_stopgame(count: int) -> List[dict]:
-    headers = {"User-Agent": "Mozilla/5.0 TamagotchiBot/1.0"}
-    config = SOURCES["stopgame"]
-    base_url = "https://stopgame.ru"
-    
-    try:
-        async with httpx.AsyncClient(timeout=20, follow_redirects=True) as client:
-            r = await client.get(config["url"], headers=headers)
-            r.raise_for_status()
-    except Exception as e:
-        logger.debug(f"[StopGame] HTTP Error: {e}")
-        return []
-    
-    soup = BeautifulSoup(r.text, 'html.parser')
-    items = []
-    seen_urls: Set[str] = set()
+def _is_duplicate(title_lower: str) -> bool:
+    """Проверяет дубликаты (заголовок уже в нижнем регистре)"""
+    normalized = " ".join(title_lower.split())
+    return _seen_news.add(normalized)
 
-    # 🔍 ВРЕМЕННЫЙ ДЕБАГ — убери после проверки
-    for a in soup.find_all("a", href=True, string=True)[:40]:
-        print(f"HREF: {a['href']!r:50} | TEXT: {a.get_text(strip=True)[:50]!r}")
-    
-    for a in soup.find_all("a", href=True, string=True):
-        if len(items) >= count:
-            break
-        
-        title = a.get_text(strip=True)
-        href = a["href"]
-        
-        if not title or len(title) < 20 or len(title) > 250:
-            continue
-        if _is_duplicate(title):
-            continue
-        
-        url = _normalize_url(base_url, href)
-        if not url or config["domain"] not in url or url in seen_urls:
-            continue
-        if any(bad in title.lower() for bad in ['реклама', 'vk.com', 't.me', 'youtube']):
+
+def _single_text(el) -> Optional[str]:
+    """
+    Текст ссылки, если он единственный потомок (как Tag.string в BeautifulSoup):
+    <a>текст</a> и <a><span>текст</span></a> — да, смешанное содержимое — None.
+    """
+    while len(el):
+        if len(el) > 1 or el.text or el[0].tail:
+            return None
+        el = el[0]
+    if not isinstance(el.tag, str):  # комментарий: get_text() его не учитывает
+        return ""
+    return el.text
+
+
+def _extract_links(content: bytes, encoding: Optional[str]) -> List[Tuple[str, str]]:
+    """Разбирает HTML и возвращает (title, href) всех ссылок с одним текстовым потомком"""
+    parser = lxml_html.HTMLParser(encoding=encoding) if encoding else None
+    root = lxml_html.fromstring(content, parser=parser)
+    links = []
+    for a in root.iter("a"):
+        href = a.get("href")
+        if href is None:
             continue
-        
-        seen_urls.add(url)
-        items.append({"title": title, "url": url, "summary": "", "source": "stopgame"})
-        logger.debug(f"[StopGame] ✅ {title[:50]}...")
-    
-    logger.info(f"[StopGame] Найдено: {len(items)} новостей")
-    return items[:count]
+        text = _single_text(a)
+        if text is not None:
+            links.append((text.strip(), href))
+    return links
 
-# ── ✅ Парсер RIA (универсальный для finance/politics) ─────────────────────
 
-async def fetch_ria_finance(count: int) -> List[dict]:
-    """Парсит RIA.ru — финансы/экономика"""
-    return await _fetch_ria_generic(count, "ria_finance")
+async def _fetch_links(url: str, headers: dict, timeout: float,
+                       client: Optional[httpx.AsyncClient] = None) -> List[Tuple[str, str]]:
+    """Скачивает страницу (с If-None-Match/If-Modified-Since) и возвращает (title, href) всех ссылок"""
+    cached = _page_cache.get(url)
+    if cached:
+        etag, last_modified, _ = cached
+        headers = dict(headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    
+    r = await (client or _get_client()).get(url, headers=headers, timeout=timeout)
+    if r.status_code == 304 and cached:
+        return cached[2]
+    r.raise_for_status()
+    
+    # Разбор HTML — чистый CPU: в потоке, чтобы не блокировать event loop
+    links = await asyncio.to_thread(_extract_links, r.content, r.charset_encoding)
+    
+    etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    if etag or last_modified:
+        _page_cache[url] = (etag, last_modified, links)
+    return links
 
 
-async def fetch_ria_politics(count: int) -> List[dict]:
-    """Парсит RIA.ru/politics — политика"""
-    return await _fetch_ria_generic(count, "ria_politics")
+# Ссылки, которые никогда не ведут на статью
+_SKIP_HREFS = ("#", "javascript:", "mailto:", "tel:")
 
 
-async def _fetch_ria_generic(count: int, source_key: str) -> List[dict]:
-    """Общий парсер для RIA источников"""
-    headers = {"User-Agent": "Mozilla/5.0 TamagotchiBot/1.0"}
+# ── ✅ Парсеры новостей (Forbes, StopGame, RIA) ──────────────────────────
+
+def _make_fetcher(source_key: str):
+    """
+    Собирает парсер для источника из SOURCES. Все настройки источника
+    разбираются один раз здесь и доступны циклу как переменные замыкания,
+    без обращений к словарю конфига на каждую ссылку.
+    """
     config = SOURCES[source_key]
-    base_url = config["url"]
-    keywords = config.get("keywords", [])
-    
-    try:
-        async with httpx.AsyncClient(timeout=20, follow_redirects=True) as client:
-            r = await client.get(base_url, headers=headers)
-            r.raise_for_status()
-    except Exception as e:
-        logger.debug(f"[{source_key}] HTTP Error: {e}")
-        return []
-    
-    soup = BeautifulSoup(r.text, 'html.parser')
-    items = []
-    seen_urls: Set[str] = set()
-    
-    for a in soup.find_all("a", href=True, string=True):
-        if len(items) >= count:
-            break
-        
-        title = a.get_text(strip=True)
-        href = a["href"]
-        
-        if not title or len(title) < 20 or len(title) > 250:
-            continue
-        if _is_duplicate(title) or _should_ignore(title):
-            continue
+    page_url = config["url"]
+    base_url = config.get("base_url", page_url)
+    domain = config["domain"]
+    label = config.get("label", source_key)
+    headers = _BROWSER_HEADERS if config.get("browser") else {}
+    timeout = config.get("timeout", 20)
+    min_len = config.get("min_len", 20)
+    ignore_re = _IGNORE_RE if config.get("ignore", True) else None
+    ad_re = _keyword_re(config["ad_words"]) if config.get("ad_words") else None
+    path_re = _keyword_re(config["paths"]) if config.get("paths") else None
+    kw_re = config.get("_kw_re")
+    
+    async def fetcher(count: int, client: Optional[httpx.AsyncClient] = None) -> List[dict]:
+        try:
+            links = await _fetch_links(page_url, headers, timeout, client)
+        except Exception as e:
+            logger.debug(f"[{label}] HTTP Error: {e}")
+            return []
         
-        url = _normalize_url(base_url, href)
-        if not url or config["domain"] not in url or url in seen_urls:
-            continue
+        items = []
+        seen_urls: Set[str] = set()
         
-        # Фильтр по ключевым словам
-        if keywords:
-            text_lower = title.lower()
-            if not any(kw in text_lower for kw in keywords):
+        # Широкий поиск + фильтрация по URL
+        for title, href in links:
+            if len(items) >= count:
+                break
+            
+            # Базовые фильтры
+            if not title or len(title) < min_len or len(title) > 250:
+                continue
+            if not href or href.startswith(_SKIP_HREFS):
+                continue
+            title_lower = title.lower()
+            if _is_duplicate(title_lower):
+                continue
+            if ignore_re and ignore_re.search(title_lower):
+                continue
+            if ad_re and ad_re.search(title_lower):
+                continue
+            
+            # URL без query/fragment; urljoin — только для относительных ссылок
+            url = href.partition("?")[0].partition("#")[0]
+            if not url.startswith("http"):
+                url = urljoin(base_url, url)
+            if domain not in url or url in seen_urls:
+                continue
+            if path_re and not path_re.search(url):
                 continue
+            
+            # Фильтр по ключевым словам
+            if kw_re and not kw_re.search(title_lower):
+                continue
+            
+            seen_urls.add(url)
+            items.append({"title": title, "url": url, "summary": "", "source": source_key})
+            # %-форматирование: строка не собирается, пока DEBUG выключен
+            logger.debug("[%s] ✅ %.50s...", label, title)
         
-        seen_urls.add(url)
-        items.append({"title": title, "url": url, "summary": "", "source": source_key})
+        logger.info(f"[{label}] Найдено: {len(items)} новостей")
+        return items[:count]
     
-    logger.info(f"[{source_key}] Найдено: {len(items)} новостей")
-    return items[:count]
+    fetcher.__name__ = fetcher.__qualname__ = f"fetch_{source_key}"
+    fetcher.__doc__ = f"Парсит новости с {page_url}"
+    return fetcher
+
+
+fetch_forbes = _make_fetcher("forbes")
+fetch_stopgame = _make_fetcher("stopgame")
+fetch_ria_finance = _make_fetcher("ria_finance")
+fetch_ria_politics = _make_fetcher("ria_politics")
 
 
 # ── 🌤️ Погода (Open-Meteo) ────────────────────────────────────────────────
@@ -288,10 +352,9 @@ async def fetch_weather() -> dict:
         "current": "temperature_2m,apparent_temperature,relative_humidity_2m,wind_speed_10m,weather_code",
         "timezone": "Europe/Moscow",
     }
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.get(WEATHER_API, params=params)
-        r.raise_for_status()
-        data = r.json()
+    r = await _get_client().get(WEATHER_API, params=params, timeout=15)
+    r.raise_for_status()
+    data = orjson.loads(r.content)
     
     current = data["current"]
     code = current["weather_code"]
@@ -309,8 +372,12 @@ async def fetch_weather() -> dict:
 
 # ── 🎭 Локальный AI fallback — КРЕАТИВНЫЕ реакции ─────────────────────────
 
+# Свой генератор модуля вместо глобального синглтона random
+_rng = random.Random()
+
+# Кортежи: неизменяемые и компактнее списков
 _CREATIVE_REACTIONS = {
-    "positive": [
+    "positive": (
         "Ура! Это просто потрясающе! 🎉 Хочу танцевать!",
         "Ого! Мир становится лучше! ✨",
         "Как здорово! Теперь у меня есть повод для радости! 🌟",
@@ -318,8 +385,8 @@ _CREATIVE_REACTIONS = {
         "Супер! Прямо зарядился позитивом! ⚡",
         "Обожаю такие новости! 🥰",
         "Это лучшая новость за сегодня! 🏆",
-    ],
-    "negative": [
+    ),
+    "negative": (
         "Ой... как же это грустно... 💔 Хочется обнимашек",
         "Эх... мир иногда бывает таким сложным... 😔",
         "Бедняжка... надеюсь, всё наладится... 🫂",
@@ -327,62 +394,69 @@ _CREATIVE_REACTIONS = {
         "Ох... это тяжело слышать... 💙",
         "Грустно... но мы справимся! Вместе! ✊",
         "Не хочу, чтобы так было... 🥺",
-    ],
-    "neutral": [
+    ),
+    "neutral": (
         "Хм... интересно, что будет дальше? 🤔",
         "Запомню это... может пригодиться! 📝",
         "Любопытно... расскажи ещё! 👂",
         "Ого, новость! Надо обдумать... 🧠",
         "Звучит важно... спасибо, что поделился! 🙏",
         "Принято к сведению! 📋",
-    ],
+    ),
 }
 
 
+_POSITIVE_KEYWORDS = [
+    'рост', 'успех', 'победа', 'помощ', 'развит', 'инвест', 'доход', 'прибыль',
+    'спас', 'нашёл', 'откры', 'снизил', 'поддерж', 'хорош', 'рад', 'рекорд', 'выгод',
+    'прорыв', 'достиж', 'благодар', 'праздник', 'подар', 'запусти', 'стартов'
+]
+_NEGATIVE_KEYWORDS = [
+    'паден', 'кризис', 'убыток', 'потер', 'авар', 'смерт', 'конфликт', 'войн',
+    'угроз', 'проблем', 'ошиб', 'отказ', 'подорож', 'инфляц', 'сокращ', 'запрет', 'крах',
+    'трагед', 'катастроф', 'преступ', 'нападен'
+]
+# Просмотр вперёд: findall находит и перекрывающиеся вхождения, set() — какие слова есть
+_POS_RE = re.compile("(?=(%s))" % "|".join(map(re.escape, _POSITIVE_KEYWORDS)))
+_NEG_RE = re.compile("(?=(%s))" % "|".join(map(re.escape, _NEGATIVE_KEYWORDS)))
+
+_WARM_STRS = tuple(f"{x}°c" for x in range(22, 30))
+_COLD_STRS = tuple(f"{x}°c" for x in range(-10, 5))
+
+
 def _local_ai_reaction(text: str, prompt_type: str = "news") -> dict:
     """Локальная реакция с КРЕАТИВНЫМИ ответами (fallback при ошибке Groq)"""
     t = text.lower()
     
     if prompt_type == "weather":
-        if "солнечно" in t or any(f"{x}°c" in t for x in range(22, 30)):
+        if "солнечно" in t or any(x in t for x in _WARM_STRS):
             return {
-                "reaction": random.choice(_CREATIVE_REACTIONS["positive"][:3]),
-                "mood_change": random.randint(12, 18),
+                "reaction": _rng.choice(_CREATIVE_REACTIONS["positive"][:3]),
+                "mood_change": _rng.randint(12, 18),
                 "is_positive": True
             }
         elif "дожд" in t or "снег" in t:
             return {
-                "reaction": random.choice(_CREATIVE_REACTIONS["negative"][:3]),
-                "mood_change": random.randint(-12, -6),
+                "reaction": _rng.choice(_CREATIVE_REACTIONS["negative"][:3]),
+                "mood_change": _rng.randint(-12, -6),
                 "is_positive": False
             }
-        elif any(f"{x}°c" in t for x in range(-10, 5)):
+        elif any(x in t for x in _COLD_STRS):
             return {
                 "reaction": "Брр, холодно! Хочу под одеялко и горячий чай! ❄️☕",
-                "mood_change": random.randint(-10, -5),
+                "mood_change": _rng.randint(-10, -5),
                 "is_positive": False
             }
         else:
             return {
-                "reaction": random.choice(_CREATIVE_REACTIONS["neutral"]),
-                "mood_change": random.randint(2, 6),
+                "reaction": _rng.choice(_CREATIVE_REACTIONS["neutral"]),
+                "mood_change": _rng.randint(2, 6),
                 "is_positive": True
             }
     
-    # Для новостей — эмоциональная логика
-    positive = [
-        'рост', 'успех', 'победа', 'помощ', 'развит', 'инвест', 'доход', 'прибыль',
-        'спас', 'нашёл', 'откры', 'снизил', 'поддерж', 'хорош', 'рад', 'рекорд', 'выгод',
-        'прорыв', 'достиж', 'благодар', 'праздник', 'подар', 'запусти', 'стартов'
-    ]
-    negative = [
-        'паден', 'кризис', 'убыток', 'потер', 'авар', 'смерт', 'конфликт', 'войн',
-        'угроз', 'проблем', 'ошиб', 'отказ', 'подорож', 'инфляц', 'сокращ', 'запрет', 'крах',
-        'трагед', 'катастроф', 'преступ', 'нападен'
-    ]
-    
-    pos = sum(2 if kw in t else 0 for kw in positive)
-    neg = sum(2 if kw in t else 0 for kw in negative)
+    # Для новостей — эмоциональная логика: +2 за каждое найденное ключевое слово
+    pos = 2 * len(set(_POS_RE.findall(t)))
+    neg = 2 * len(set(_NEG_RE.findall(t)))
     
     # Добавляем вариативность
     if '!' in text:
@@ -392,34 +466,42 @@ def _local_ai_reaction(text: str, prompt_type: str = "news") -> dict:
     
     if pos > neg + 2:
         return {
-            "reaction": random.choice(_CREATIVE_REACTIONS["positive"]),
-            "mood_change": random.randint(10, 20),
+            "reaction": _rng.choice(_CREATIVE_REACTIONS["positive"]),
+            "mood_change": _rng.randint(10, 20),
             "is_positive": True
         }
     elif neg > pos + 2:
         return {
-            "reaction": random.choice(_CREATIVE_REACTIONS["negative"]),
-            "mood_change": random.randint(-20, -8),
+            "reaction": _rng.choice(_CREATIVE_REACTIONS["negative"]),
+            "mood_change": _rng.randint(-20, -8),
             "is_positive": False
         }
     else:
         # Нейтральные — но с небольшой случайной окраской
-        if random.random() < 0.6:
+        if _rng.random() < 0.6:
             return {
-                "reaction": random.choice(_CREATIVE_REACTIONS["neutral"]),
-                "mood_change": random.randint(3, 8),
+                "reaction": _rng.choice(_CREATIVE_REACTIONS["neutral"]),
+                "mood_change": _rng.randint(3, 8),
                 "is_positive": True
             }
         else:
             return {
-                "reaction": random.choice(_CREATIVE_REACTIONS["negative"][-2:]),
-                "mood_change": random.randint(-6, -2),
+                "reaction": _rng.choice(_CREATIVE_REACTIONS["negative"][-2:]),
+                "mood_change": _rng.randint(-6, -2),
                 "is_positive": False
             }
 
 
 # ── ✅ Groq API — эмоциональный промпт ─────────────────────────────────────
 
+_JSON_RE = re.compile(r'\{[\s\S]*\}')
+
+# LRU ответов Groq: (prompt_type, нормализованный текст) -> реакция.
+# Повторный заголовок (между опросами или источниками mix) не идёт в сеть.
+_ai_cache: "OrderedDict[Tuple[str, str], dict]" = OrderedDict()
+_AI_CACHE_MAX = 512
+
+
 async def analyze_with_groq(text: str, prompt_type: str = "news") -> dict:
     """Анализ через Groq API с КРЕАТИВНЫМ промптом"""
     
@@ -427,6 +509,12 @@ async def analyze_with_groq(text: str, prompt_type: str = "news") -> dict:
         logger.debug("[Groq] Нет ключа → локальный AI")
         return _local_ai_reaction(text, prompt_type)
     
+    cache_key = (prompt_type, " ".join(text.lower().split()))
+    cached = _ai_cache.get(cache_key)
+    if cached is not None:
+        _ai_cache.move_to_end(cache_key)
+        return dict(cached)
+    
     # 🎭 ПРОМПТ для ярких, эмоциональных реакций
     system_prompt = (
         "Ты — игривый, эмоциональный питомец-тамагочи. Твоя задача — реагировать на новости ЖИВО и КРЕАТИВНО!\n\n"
@@ -471,35 +559,38 @@ async def analyze_with_groq(text: str, prompt_type: str = "news") -> dict:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            r = await client.post(GROQ_API_URL, json=payload, headers=headers)
-            
-            # Обработка ошибок — ТОЛЬКО debug логи
-            if r.status_code in [401, 403, 429]:
-                logger.debug(f"[Groq] {r.status_code} → локальный AI")
-                return _local_ai_reaction(text, prompt_type)
-            if r.status_code != 200:
-                logger.debug(f"[Groq] HTTP {r.status_code} → локальный AI")
-                return _local_ai_reaction(text, prompt_type)
-            
-            data = r.json()
-            raw = data["choices"][0]["message"]["content"].strip()
+        r = await _get_client().post(GROQ_API_URL, content=orjson.dumps(payload), headers=headers, timeout=30)
+        
+        # Обработка ошибок — ТОЛЬКО debug логи
+        if r.status_code in [401, 403, 429]:
+            logger.debug(f"[Groq] {r.status_code} → локальный AI")
+            return _local_ai_reaction(text, prompt_type)
+        if r.status_code != 200:
+            logger.debug(f"[Groq] HTTP {r.status_code} → локальный AI")
+            return _local_ai_reaction(text, prompt_type)
+        
+        data = orjson.loads(r.content)
+        raw = data["choices"][0]["message"]["content"].strip()
             
     except Exception as e:
         logger.debug(f"[Groq] Error: {e}")
         return _local_ai_reaction(text, prompt_type)
     
-    # Парсинг JSON
+    # Парсинг JSON: с response_format=json_object ответ и так чистый JSON,
+    # поиск объекта регуляркой — только запасной путь
     try:
-        json_match = re.search(r'\{[\s\S]*\}', raw)
-        result = json.loads(json_match.group() if json_match else raw)
+        try:
+            result = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            json_match = _JSON_RE.search(raw)
+            result = orjson.loads(json_match.group() if json_match else raw)
         
         mood = int(result.get("mood_change", 0))
         mood = max(-20, min(20, mood))
         
         # Если AI вернул 0 — заменяем на ненулевое
         if mood == 0:
-            mood = random.choice([-5, -3, 3, 5, 8])
+            mood = _rng.choice((-5, -3, 3, 5, 8))
         
         is_pos = bool(result.get("is_positive", mood > 0))
         if mood > 0:
@@ -510,7 +601,11 @@ async def analyze_with_groq(text: str, prompt_type: str = "news") -> dict:
         reaction = str(result.get("reaction", "Хмм...")).strip()
         reaction = reaction[:130] if len(reaction) > 130 else reaction
         
-        return {"reaction": reaction, "mood_change": mood, "is_positive": is_pos}
+        result = {"reaction": reaction, "mood_change": mood, "is_positive": is_pos}
+        _ai_cache[cache_key] = result
+        if len(_ai_cache) > _AI_CACHE_MAX:
+            _ai_cache.popitem(last=False)
+        return dict(result)
         
     except Exception as e:
         logger.debug(f"[Groq] Parse error → локальный AI")
@@ -542,12 +637,16 @@ async def get_news_with_reaction(count: int = 1, source: str = "forbes") -> List
     if source == "mix":
         news = []
         del fetchers["stopgame"]  # Убираем StopGame из микса, так как там часто новости не по теме
-        for name, fetcher in fetchers.items():
-            try:
-                items = await fetcher(max(1, count // 4))
-                news.extend(items)
-            except Exception as e:
-                logger.debug(f"[{name}] Error: {e}")
+        # Источники опрашиваются параллельно: время ≈ самый медленный, а не сумма
+        results = await asyncio.gather(
+            *(fetcher(max(1, count // 4)) for fetcher in fetchers.values()),
+            return_exceptions=True,
+        )
+        for name, items in zip(fetchers, results):
+            if isinstance(items, BaseException):
+                logger.debug(f"[{name}] Error: {items}")
+                continue
+            news.extend(items)
         news = news[:count]
     else:
         fetcher = fetchers.get(source, fetch_forbes)
@@ -557,17 +656,17 @@ async def get_news_with_reaction(count: int = 1, source: str = "forbes") -> List
         logger.debug(f"[{source}] Нет новостей")
         return []
     
-    # Анализ через AI
+    # Анализ через AI — запросы к Groq по всем новостям идут параллельно
+    ais = await asyncio.gather(
+        *(analyze_with_groq(f"Заголовок: {n['title']}", prompt_type="news") for n in news),
+        return_exceptions=True,
+    )
     results = []
-    for n in news:
-        try:
-            context = f"Заголовок: {n['title']}"
-            ai = await analyze_with_groq(context, prompt_type="news")
-            results.append({**n, **ai})
-        except Exception as e:
-            logger.debug(f"[AI] Error: {e}")
+    for n, ai in zip(news, ais):
+        if isinstance(ai, BaseException):
+            logger.debug(f"[AI] Error: {ai}")
             ai = _local_ai_reaction(n["title"], prompt_type="news")
-            results.append({**n, **ai})
+        results.append({**n, **ai})
     
     return results
 
@@ -593,6 +692,5 @@ async def get_weather_reaction() -> dict:
 
 def clear_news_history():
     """Очищает историю просмотренных новостей"""
-    global _seen_news
     _seen_news.clear()
     logger.debug("[CLEANUP] История очищена")
\ No newline at end of file
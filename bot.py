@@ -8,19 +8,24 @@ import asyncio
 import logging
 import sqlite3
 import json
-from datetime import datetime, timedelta
+import orjson
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import time
+import bisect
 from pathlib import Path
+from typing import AsyncIterator
 from dotenv import load_dotenv
+from cachetools import TTLCache
 
+import aiosqlite
 import telebot
-from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, InputMediaPhoto
+from telebot.async_telebot import AsyncTeleBot
+from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 
-from Modules.news_module import get_news_with_reaction, get_weather_reaction
+from Modules.news_module import get_news_with_reaction, get_weather_reaction, close_http_client
 from tasks import start_background_tasks
-from image_utils import (
-    get_status_image, get_action_image, get_low_stat_image,
-    composite_cat_image
-)
+from image_utils import get_action_image, composite_cat_image
 
 # ── Загрузка переменных окружения ────────────────────────────────────────────
 load_dotenv()
@@ -37,43 +42,262 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ── Инициализация бота ──────────────────────────────────────────────────────
-bot = telebot.TeleBot(TELEGRAM_TOKEN, parse_mode="HTML")
+# Асинхронный бот: все обработчики работают в одном event loop,
+# ожидание Telegram API и БД не занимает рабочие потоки
+bot = AsyncTeleBot(TELEGRAM_TOKEN, parse_mode="HTML")
 
 # ── Инициализация БД ────────────────────────────────────────────────────────
 DB_PATH = "pets.db"
 
+# WITHOUT ROWID: таблица сама упорядочена по user_id, поиск питомца —
+# один спуск по B-дереву вместо двух (индекс PRIMARY KEY → rowid → строка)
+PETS_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        user_id        TEXT PRIMARY KEY,
+        name           TEXT NOT NULL,
+        money          INTEGER DEFAULT 100,
+        satiety        INTEGER DEFAULT 100,
+        energy         INTEGER DEFAULT 100,
+        mood           INTEGER DEFAULT 100,
+        states         JSON DEFAULT NULL,
+        user_inv_mask  INTEGER NOT NULL DEFAULT 0,
+        pet_inv_item   TEXT DEFAULT NULL,
+        last_satiety_check    INTEGER DEFAULT NULL,
+        last_energy_check     INTEGER DEFAULT NULL,
+        last_mood_check       INTEGER DEFAULT NULL,
+        last_news_check       INTEGER DEFAULT NULL,
+        warned_satiety INTEGER DEFAULT 0,
+        warned_mood    INTEGER DEFAULT 0,
+        warned_energy  INTEGER DEFAULT 0
+    ) WITHOUT ROWID;
+"""
+
+# Частичные индексы под выборку tasks.claim_low_stat_alerts: в каждом только «голодные» питомцы,
+# поэтому проверка низких показателей читает O(совпадений), а не всю таблицу.
+# Пороги должны совпадать с литералами в запросе — иначе планировщик индекс не возьмёт
+PETS_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_pets_low_satiety ON pets(satiety) WHERE satiety < 30",
+    "CREATE INDEX IF NOT EXISTS idx_pets_low_energy ON pets(energy) WHERE energy < 20",
+    "CREATE INDEX IF NOT EXISTS idx_pets_low_mood ON pets(mood) WHERE mood < 30",
+)
+
+def migrate_pets_without_rowid(conn: sqlite3.Connection):
+    """Однократно переносит старую rowid-таблицу pets в схему WITHOUT ROWID"""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'pets'").fetchone()
+    if row is None or "WITHOUT ROWID" in row[0].upper():
+        return
+    old_cols = [r[1] for r in conn.execute("PRAGMA table_info(pets)")]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DROP TABLE IF EXISTS pets_new")
+        conn.execute(PETS_DDL.format(table="pets_new"))
+        new_cols = {r[1] for r in conn.execute("PRAGMA table_info(pets_new)")}
+        cols = ", ".join(c for c in old_cols if c in new_cols)
+        conn.execute(f"INSERT INTO pets_new ({cols}) SELECT {cols} FROM pets")
+        conn.execute("DROP TABLE pets")
+        conn.execute("ALTER TABLE pets_new RENAME TO pets")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info("✅ Таблица pets перенесена в WITHOUT ROWID")
+
+# Набор аксессуаров фиксирован: инвентарь пользователя — битовая маска,
+# надетый аксессуар (он всегда один) — имя в pet_inv_item
+_ITEM_BITS = {"finance": 1, "gaming": 2, "weather": 4}
+
+def _item_bit(item: str) -> int:
+    bit = _ITEM_BITS.get(item)
+    if bit is None:
+        raise ValueError(f"Неизвестный предмет: {item}")
+    return bit
+
+_CHECK_TYPES = ("satiety", "energy", "mood", "news")
+
+def migrate_last_check_columns(conn: sqlite3.Connection):
+    """Однократно переводит last_*_check из ISO-строк в INTEGER (unix time)"""
+    types = {r[1]: r[2].upper() for r in conn.execute("PRAGMA table_info(pets)")}
+    todo = [c for c in _CHECK_TYPES if types.get(f"last_{c}_check") == "TEXT"]
+    if not todo:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Колонка с affinity TEXT хранила бы числа строками, поэтому она пересоздаётся.
+        # isoformat() писался в локальном времени — 'utc' переводит его в UTC
+        for c in todo:
+            col = f"last_{c}_check"
+            conn.execute(f"ALTER TABLE pets ADD COLUMN {col}_i INTEGER DEFAULT NULL")
+            conn.execute(f"UPDATE pets SET {col}_i = CAST(strftime('%s', {col}, 'utc') AS INTEGER)"
+                         f" WHERE {col} IS NOT NULL")
+            conn.execute(f"ALTER TABLE pets DROP COLUMN {col}")
+            conn.execute(f"ALTER TABLE pets RENAME COLUMN {col}_i TO {col}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info("✅ Колонки last_*_check переведены в unix time")
+
+def migrate_inventory_columns(conn: sqlite3.Connection):
+    """Однократно переносит JSON-инвентари в user_inv_mask/pet_inv_item и удаляет JSON-колонки"""
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(pets)")}
+    if "PetInventory" not in cols:
+        return
+    bits = " ".join(f"WHEN '{item}' THEN {bit}" for item, bit in _ITEM_BITS.items())
+    known = ", ".join(f"'{item}'" for item in _ITEM_BITS)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # В базах, где маска уже есть, источник правды — она (её пишет бот),
+        # и устаревшие JSON-колонки просто удаляются
+        if "user_inv_mask" not in cols:
+            conn.execute("ALTER TABLE pets ADD COLUMN user_inv_mask INTEGER NOT NULL DEFAULT 0")
+            conn.execute("ALTER TABLE pets ADD COLUMN pet_inv_item TEXT DEFAULT NULL")
+            # Неизвестные предметы не переносятся — у бота для них нет слоя и новостей
+            conn.execute(f"""
+                UPDATE pets SET
+                    user_inv_mask = (SELECT COALESCE(SUM(DISTINCT CASE value {bits} ELSE 0 END), 0)
+                                     FROM json_each(COALESCE(UserInventory, '[]'))),
+                    pet_inv_item = (SELECT value FROM json_each(COALESCE(PetInventory, '[]'))
+                                    WHERE value IN ({known}) LIMIT 1)
+                WHERE UserInventory IS NOT NULL OR PetInventory IS NOT NULL
+            """)
+        conn.execute("ALTER TABLE pets DROP COLUMN PetInventory")
+        conn.execute("ALTER TABLE pets DROP COLUMN UserInventory")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info("✅ Инвентари pets перенесены в user_inv_mask/pet_inv_item")
+
+# Настройки каждого подключения: WAL, fsync только на чекпоинтах,
+# временные таблицы в памяти, mmap и крупный кэш страниц
+DB_POOL_SIZE = 8
+DB_CACHED_STATEMENTS = 256
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-20000",
+)
+
 def init_db():
     """Инициализирует БД если её нет"""
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS pets (
-            user_id        TEXT PRIMARY KEY,
-            name           TEXT NOT NULL,
-            money          INTEGER DEFAULT 100,
-            satiety        INTEGER DEFAULT 100,
-            energy         INTEGER DEFAULT 100,
-            mood           INTEGER DEFAULT 100,
-            states         JSON DEFAULT NULL,
-            PetInventory   JSON DEFAULT NULL,
-            UserInventory  JSON DEFAULT NULL,
-            last_satiety_check    TEXT DEFAULT NULL,
-            last_energy_check     TEXT DEFAULT NULL,
-            last_mood_check       TEXT DEFAULT NULL,
-            last_news_check       TEXT DEFAULT NULL
-        );
-    """)
+    # journal_mode=WAL сохраняется в файле БД; остальные настройки действуют
+    # только на подключение и повторяются в SQLitePool._connect
+    conn.executescript(";".join(DB_PRAGMAS))
+    # Сначала колонки инвентаря и last_*_check: перенос в WITHOUT ROWID копирует уже перенесённые значения
+    migrate_inventory_columns(conn)
+    migrate_last_check_columns(conn)
+    migrate_pets_without_rowid(conn)
+    conn.execute(PETS_DDL.format(table="pets"))
+    for ddl in PETS_INDEXES:
+        conn.execute(ddl)
     conn.commit()
     conn.close()
     logger.info("✅ БД инициализирована")
 
-def get_db_connection():
-    """Получает подключение к БД"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+class SQLitePool:
+    """
+    Пул подключений aiosqlite: N читателей и один писатель.
+    Читатели в WAL не ждут писателя; записи SQLite всё равно сериализует,
+    поэтому писатель один и выдаётся под asyncio.Lock.
+    """
+
+    def __init__(self, path: str, readers: int = DB_POOL_SIZE):
+        self.path = path
+        self.size = readers
+        self._writer: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+        self._readers: asyncio.Queue = asyncio.Queue()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        # isolation_level=None: одиночные выражения коммитятся сами,
+        # многошаговые операции явно открывают BEGIN IMMEDIATE через transaction()
+        db = await aiosqlite.connect(self.path, cached_statements=DB_CACHED_STATEMENTS, isolation_level=None)
+        db.row_factory = aiosqlite.Row
+        for pragma in DB_PRAGMAS:
+            await db.execute(pragma)
+        return db
+
+    async def open(self) -> None:
+        self._writer = await self._connect()
+        for _ in range(self.size):
+            self._readers.put_nowait(await self._connect())
+
+    async def close(self) -> None:
+        while not self._readers.empty():
+            await self._readers.get_nowait().close()
+        if self._writer:
+            await self._writer.close()
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Взять читателя из пула на время блока."""
+        db = await self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Эксклюзивный доступ к подключению-писателю."""
+        async with self._write_lock:
+            yield self._writer
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Группирует несколько выражений в одну транзакцию (один fsync на COMMIT)."""
+        async with self.writer() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                await db.rollback()
+                raise
+            await db.commit()
+
+_pool: SQLitePool = None
+
+async def open_db_pool():
+    """Открывает пул подключений (вызывается в main() до запуска polling)"""
+    global _pool
+    _pool = SQLitePool(DB_PATH)
+    await _pool.open()
+
+# Кэш строк питомцев: всплеск нажатий кнопок читает БД не чаще раза в PET_CACHE_TTL
+# секунд на пользователя. Любая запись через db_* кладёт в кэш свежую строку,
+# фоновые задачи tasks.py после своих UPDATE сбрасывают кэш целиком.
+# Записи контроллера (другой процесс) видны не позже чем через PET_CACHE_TTL.
+# Обращения идут только из event loop бота, поэтому блокировка не нужна
+PET_CACHE_TTL = 2.0
+_pet_cache: TTLCache = TTLCache(maxsize=10_000, ttl=PET_CACHE_TTL)
+# Растёт при каждой записи и сбросе: db_get_pet не кладёт в кэш строку,
+# если за время её SELECT кэш уже обновили или сбросили
+_pet_cache_epoch = 0
+
+def _cache_pet(user_id, row) -> dict:
+    """Кладёт строку питомца в кэш и возвращает её копию"""
+    global _pet_cache_epoch
+    _pet_cache_epoch += 1
+    key = str(user_id)
+    if row is None:
+        _pet_cache.pop(key, None)
+        return None
+    pet = dict(row)
+    _pet_cache[key] = pet
+    return dict(pet)
+
+def _invalidate_pet(user_id=None):
+    """Сбрасывает кэш одного питомца (или всех, если user_id не задан)"""
+    global _pet_cache_epoch
+    _pet_cache_epoch += 1
+    if user_id is None:
+        _pet_cache.clear()
+    else:
+        _pet_cache.pop(str(user_id), None)
 
 # ── Пути к изображениям ────────────────────────────────────────────────────
 IMAGES_DIR = Path("Images")
@@ -93,208 +317,318 @@ IMG_SATIETY_ICON = IMAGES_DIR / "SatietyIcon.png"
 IMG_FOOD = IMAGES_DIR / "Food.png"
 IMG_GAME = IMAGES_DIR / "Game.png"
 
+def _preload_images(paths) -> dict:
+    """Читает статичные картинки один раз при запуске, чтобы не открывать файлы на каждое нажатие"""
+    images = {}
+    for path in paths:
+        try:
+            images[path] = path.read_bytes()
+        except OSError as e:
+            logger.error(f"Не удалось загрузить {path}: {e}")
+    return images
+
+_STATIC_IMAGES = _preload_images((IMG_CAT, IMG_CAT_LOW_ENERGY, IMG_FOOD, IMG_GAME))
+
 # ── Вспомогательные функции ─────────────────────────────────────────────────
 
+# JSON-колонки (инвентари, состояния) кодируются через orjson; в БД хранится текст
+_loads = orjson.loads
+
+def _dumps(obj) -> str:
+    return orjson.dumps(obj).decode()
+
 def clamp(value: int, lo: int = 0, hi: int = 100) -> int:
     """Ограничивает значение в диапазоне"""
     return max(lo, min(hi, value))
 
+# Границы настроения и эмодзи для каждого интервала: [0, 20) → 😭, ..., [80, 100] → 🤩
+_MOOD_BOUNDS = (20, 40, 60, 80)
+_MOOD_EMOJI = ("😭", "😟", "😐", "😊", "🤩")
+
 def mood_emoji(mood: int) -> str:
     """Возвращает эмодзи в зависимости от настроения"""
-    if mood >= 80: return "🤩"
-    elif mood >= 60: return "😊"
-    elif mood >= 40: return "😐"
-    elif mood >= 20: return "😟"
-    else: return "😭"
+    return _MOOD_EMOJI[bisect.bisect_right(_MOOD_BOUNDS, mood)]
+
+# Тексты тревожных состояний для всех 8 сочетаний флагов
+# (бит 0 — сытость <= 30, бит 1 — энергия <= 20, бит 2 — настроение <= 50)
+_ALERT_LINES = ("🍖 <b>ГОЛОДАЕТ!</b>", "⚡ <b>ИСТОЩЕНИЕ!</b>", "😢 <b>ГРУСТИТ!</b>")
+_ALERT_TEXTS = tuple(
+    "\n".join(line for bit, line in enumerate(_ALERT_LINES) if mask >> bit & 1)
+    for mask in range(1 << len(_ALERT_LINES))
+)
 
 def get_status_text(pet: dict) -> str:
     """Возвращает текст статуса питомца с иконками"""
-    lines = []
-    
-    if pet["satiety"] <= 30:
-        lines.append("🍖 <b>ГОЛОДАЕТ!</b>")
-    if pet["energy"] <= 20:
-        lines.append("⚡ <b>ИСТОЩЕНИЕ!</b>")
-    if pet["mood"] <= 50:
-        lines.append("😢 <b>ГРУСТИТ!</b>")
-    
-    if not lines:
-        lines.append(f"{mood_emoji(pet['mood'])} Всё хорошо")
-    
-    return "\n".join(lines)
+    mask = (pet["satiety"] <= 30) | ((pet["energy"] <= 20) << 1) | ((pet["mood"] <= 50) << 2)
+    if not mask:
+        return f"{mood_emoji(pet['mood'])} Всё хорошо"
+    return _ALERT_TEXTS[mask]
 
-def safe_edit_or_send(chat_id: int, msg_id: int, text: str, reply_markup=None):
+async def safe_edit_or_send(chat_id: int, msg_id: int, text: str, reply_markup=None):
     """Редактирует сообщение или отправляет новое, если редактирование невозможно (например, сообщение — фото)"""
     try:
-        bot.edit_message_text(text, chat_id, msg_id, reply_markup=reply_markup)
+        await bot.edit_message_text(text, chat_id, msg_id, reply_markup=reply_markup)
     except Exception:
-        bot.send_message(chat_id, text, reply_markup=reply_markup)
+        await bot.send_message(chat_id, text, reply_markup=reply_markup)
 
-# ── API контроллера (обёртки для синхронных вызовов) ────────────────────────
+# Telegram file_id уже отправленных картинок: повторная отправка — ссылка на файл без загрузки.
+# Ключ описывает содержимое: ("static", имя файла), ("cat", аксессуар, иконки), ("action", действие, аксессуар)
+_FILE_ID_CACHE: dict[tuple, str] = {}
 
-def db_create_pet(user_id: str, name: str) -> dict:
+async def send_cached_photo(chat_id: int, key: tuple, produce, caption: str = None, reply_markup=None):
+    """Отправляет картинку по сохранённому file_id; produce() вызывается только если его ещё нет"""
+    file_id = _FILE_ID_CACHE.get(key)
+    if file_id is not None:
+        try:
+            return await bot.send_photo(chat_id, file_id, caption=caption, reply_markup=reply_markup)
+        except telebot.asyncio_helper.ApiTelegramException as e:
+            logger.warning(f"file_id для {key} больше не действует: {e}")
+            _FILE_ID_CACHE.pop(key, None)
+    # Сборка картинки (Pillow) блокирует — выполняется в пуле потоков, не в event loop
+    photo = await asyncio.to_thread(produce)
+    msg = await bot.send_photo(chat_id, photo, caption=caption, reply_markup=reply_markup)
+    if msg is not None and msg.photo:
+        _FILE_ID_CACHE[key] = msg.photo[-1].file_id
+    return msg
+
+async def send_static_photo(chat_id: int, path: Path, caption: str = None, reply_markup=None):
+    """Отправляет статичную картинку из _STATIC_IMAGES через кэш file_id"""
+    return await send_cached_photo(chat_id, ("static", path.name), lambda: _STATIC_IMAGES[path],
+                             caption=caption, reply_markup=reply_markup)
+
+# ── API контроллера (асинхронные обёртки над пулом aiosqlite) ───────────────
+
+# Все запросы — константы: одна и та же строка SQL на одном подключении пула
+# берётся из кэша подготовленных выражений sqlite3 без повторного разбора
+_SQL_GET_PET = "SELECT * FROM pets WHERE user_id = ?"
+_SQL_CREATE_PET = """
+    INSERT INTO pets (user_id, name) VALUES (?, ?)
+    ON CONFLICT (user_id) DO NOTHING
+    RETURNING *
+"""
+_SQL_DELETE_PET = "DELETE FROM pets WHERE user_id = ?"
+_SQL_ADD_MONEY = """
+    UPDATE pets SET money = MAX(0, money + ?)
+    WHERE user_id = ?
+    RETURNING *
+"""
+_SQL_APPLY_MINUS = """
+    UPDATE pets SET
+        satiety = MAX(0, MIN(100, satiety - ?)),
+        energy  = MAX(0, MIN(100, energy - ?)),
+        mood    = MAX(0, MIN(100, mood - ?))
+    WHERE user_id = ?
+    RETURNING *
+"""
+_SQL_APPLY_DELTA = """
+    UPDATE pets SET
+        money   = MAX(0, money + ?),
+        satiety = MAX(0, MIN(100, satiety + ?)),
+        energy  = MAX(0, MIN(100, energy + ?)),
+        mood    = MAX(0, MIN(100, mood + ?))
+    WHERE user_id = ? AND money >= ? AND energy >= ?
+      AND satiety < ? AND energy < ? AND mood < ?
+    RETURNING *
+"""
+# Сон: восстановление 10 * (сытость / 100), минимум 1 — как в tasks.bulk_energy_recovery
+_SQL_SLEEP = """
+    UPDATE pets SET energy = MIN(100, energy + MAX(1, 10 * satiety / 100))
+    WHERE user_id = ? AND energy < 100
+    RETURNING *
+"""
+_SQL_BUY_ITEM = """
+    UPDATE pets SET
+        money = money - ?1,
+        user_inv_mask = user_inv_mask | ?2
+    WHERE user_id = ?3 AND money >= ?1 AND user_inv_mask & ?2 = 0
+    RETURNING *
+"""
+_SQL_ADD_USER_ITEM = "UPDATE pets SET user_inv_mask = user_inv_mask | ? WHERE user_id = ? RETURNING *"
+_SQL_REMOVE_USER_ITEM = "UPDATE pets SET user_inv_mask = user_inv_mask & ~? WHERE user_id = ? RETURNING *"
+_SQL_SET_PET_ITEM = "UPDATE pets SET pet_inv_item = ? WHERE user_id = ? RETURNING *"
+_SQL_RESET_ALL_PETS = "UPDATE pets SET satiety = 10, energy = 10, mood = 10, money = 500"
+
+# Белые списки полей: имя колонки никогда не подставляется в SQL из аргумента
+_UPDATABLE_FIELDS = ("name", "money", "satiety", "energy", "mood", "states")
+_SQL_UPDATE_FIELD = {
+    field: f"UPDATE pets SET {field} = ? WHERE user_id = ? RETURNING *" for field in _UPDATABLE_FIELDS
+}
+_SQL_UPDATE_LAST_CHECK = {
+    check_type: f"UPDATE pets SET last_{check_type}_check = ? WHERE user_id = ?" for check_type in _CHECK_TYPES
+}
+
+async def db_create_pet(user_id: str, name: str) -> dict | None:
     """Создать питомца"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-        if cur.fetchone():
-            conn.close()
-            return None  # Питомец уже существует
-        
-        cur.execute("INSERT INTO pets (user_id, name) VALUES (?, ?)", (user_id, name))
-        conn.commit()
-        cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-        return dict(cur.fetchone())
-    finally:
-        conn.close()
+    # ON CONFLICT DO NOTHING не возвращает строку, если питомец уже существует
+    async with _pool.writer() as db, db.execute(_SQL_CREATE_PET, (user_id, name)) as cur:
+        row = await cur.fetchone()
+    return _cache_pet(user_id, row) if row else None
 
-def db_get_pet(user_id: str) -> dict:
+async def db_get_pet(user_id: str) -> dict | None:
     """Получить питомца"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-        row = cur.fetchone()
-        return dict(row) if row else None
-    finally:
-        conn.close()
-
-def db_delete_pet(user_id: str) -> bool:
-    """Удалить питомца"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("DELETE FROM pets WHERE user_id = ?", (user_id,))
-        conn.commit()
-        return True
-    finally:
-        conn.close()
-
-def db_update_pet_value(user_id: str, field: str, value) -> dict:
+    pet = _pet_cache.get(str(user_id))
+    if pet is not None:
+        return dict(pet)
+    epoch = _pet_cache_epoch
+    async with _pool.reader() as db, db.execute(_SQL_GET_PET, (user_id,)) as cur:
+        row = await cur.fetchone()
+    if not row:
+        return None
+    if epoch != _pet_cache_epoch:
+        # Пока шёл SELECT, питомцев меняли: строка могла устареть, в кэш её не кладём
+        return dict(row)
+    return _cache_pet(user_id, row)
+
+async def db_delete_pet(user_id: str) -> bool:
+    """Удалить питомца (False, если его не было)"""
+    async with _pool.writer() as db, db.execute(_SQL_DELETE_PET, (user_id,)) as cur:
+        deleted = cur.rowcount > 0
+    _invalidate_pet(user_id)
+    return deleted
+
+async def db_update_pet_value(user_id: str, field: str, value) -> dict | None:
     """Обновить одно значение питомца"""
+    sql = _SQL_UPDATE_FIELD.get(field)
+    if sql is None:
+        raise ValueError(f"Недопустимое поле: {field}")
     if isinstance(value, (dict, list)):
-        value = json.dumps(value)
+        value = _dumps(value)
     
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute(f"UPDATE pets SET {field} = ? WHERE user_id = ?", (value, user_id))
-        conn.commit()
-        cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-        return dict(cur.fetchone())
-    finally:
-        conn.close()
+    async with _pool.writer() as db, db.execute(sql, (value, user_id)) as cur:
+        row = await cur.fetchone()
+    return _cache_pet(user_id, row)
 
-def db_add_money(user_id: str, amount: int) -> dict:
+async def db_add_money(user_id: str, amount: int) -> dict | None:
     """Добавить деньги"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT money FROM pets WHERE user_id = ?", (user_id,))
-        row = cur.fetchone()
-        new_money = max(0, row["money"] + amount)
-        cur.execute("UPDATE pets SET money = ? WHERE user_id = ?", (new_money, user_id))
-        conn.commit()
-        cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-        return dict(cur.fetchone())
-    finally:
-        conn.close()
+    async with _pool.writer() as db, db.execute(_SQL_ADD_MONEY, (amount, user_id)) as cur:
+        row = await cur.fetchone()
+    return _cache_pet(user_id, row)
 
-def db_apply_minus(user_id: str, satiety_n: int = 0, energy_n: int = 0, mood_n: int = 0) -> dict:
+async def db_apply_minus(user_id: str, satiety_n: int = 0, energy_n: int = 0, mood_n: int = 0) -> dict | None:
     """Вычесть значения (с clamp 0-100)"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-        pet = cur.fetchone()
-        if not pet:
-            return None
-        
-        new_satiety = clamp(pet["satiety"] - satiety_n)
-        new_energy = clamp(pet["energy"] - energy_n)
-        new_mood = clamp(pet["mood"] - mood_n)
-        
-        cur.execute("""
-            UPDATE pets SET satiety = ?, energy = ?, mood = ?
-            WHERE user_id = ?
-        """, (new_satiety, new_energy, new_mood, user_id))
-        conn.commit()
-        
-        cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-        return dict(cur.fetchone())
-    finally:
-        conn.close()
-
-def db_get_pet_inventory(user_id: str) -> list:
+    # clamp выполняется прямо в SQL — одно обращение к БД вместо SELECT → UPDATE → SELECT
+    async with _pool.writer() as db, db.execute(_SQL_APPLY_MINUS, (satiety_n, energy_n, mood_n, user_id)) as cur:
+        row = await cur.fetchone()
+    return _cache_pet(user_id, row)
+
+async def db_apply_delta(user_id: str, d_money: int = 0, d_satiety: int = 0, d_energy: int = 0,
+                         d_mood: int = 0, require_money: int = 0, require_energy: int = 0,
+                         satiety_below: int = 101, energy_below: int = 101, mood_below: int = 101) -> dict | None:
+    """Применить изменения характеристик одним UPDATE (с clamp 0-100).
+    Возвращает None, если питомца нет, не хватает монет/энергии
+    или показатель уже не ниже *_below (например, питомец сыт)"""
+    # Проверка условий в WHERE делает списание атомарным: два быстрых нажатия
+    # не спишут монеты дважды
+    params = (d_money, d_satiety, d_energy, d_mood, user_id, require_money, require_energy,
+              satiety_below, energy_below, mood_below)
+    async with _pool.writer() as db, db.execute(_SQL_APPLY_DELTA, params) as cur:
+        row = await cur.fetchone()
+    return _cache_pet(user_id, row)
+
+async def db_sleep(user_id: str) -> dict | None:
+    """Отдых: восстановить энергию одним UPDATE.
+    Возвращает None, если питомца нет или энергия уже полная"""
+    async with _pool.writer() as db, db.execute(_SQL_SLEEP, (user_id,)) as cur:
+        row = await cur.fetchone()
+    return _cache_pet(user_id, row)
+
+async def db_buy_item(user_id: str, item: str, price: int) -> dict | None:
+    """Купить предмет: списать монеты и добавить его в инвентарь одним UPDATE.
+    Возвращает None, если питомца нет, не хватает монет или предмет уже куплен"""
+    async with _pool.writer() as db, db.execute(_SQL_BUY_ITEM, (price, _item_bit(item), user_id)) as cur:
+        row = await cur.fetchone()
+    return _cache_pet(user_id, row)
+
+def _user_items(pet: dict) -> list:
+    """Предметы пользователя из маски уже загруженной строки питомца"""
+    mask = pet.get("user_inv_mask") or 0
+    return [item for item, bit in _ITEM_BITS.items() if mask & bit]
+
+def _pet_items(pet: dict) -> list:
+    """Надетый аксессуар списком (пустым, если ничего не надето)"""
+    item = pet.get("pet_inv_item")
+    return [item] if item else []
+
+async def db_get_pet_inventory(user_id: str, pet: dict = None) -> list:
     """Получить инвентарь питомца (надетые аксессуары)"""
-    pet = db_get_pet(user_id)
+    if pet is None:
+        pet = await db_get_pet(user_id)
     if not pet:
         return []
-    inv = pet.get("PetInventory")
-    return json.loads(inv) if inv and isinstance(inv, str) else (inv if inv else [])
+    return _pet_items(pet)
 
-def db_get_user_inventory(user_id: str) -> list:
+async def db_get_user_inventory(user_id: str, pet: dict = None) -> list:
     """Получить инвентарь пользователя"""
-    pet = db_get_pet(user_id)
+    if pet is None:
+        pet = await db_get_pet(user_id)
     if not pet:
         return []
-    inv = pet.get("UserInventory")
-    return json.loads(inv) if inv and isinstance(inv, str) else (inv if inv else [])
+    return _user_items(pet)
 
-def db_add_pet_item(user_id: str, item: str) -> list:
+async def db_add_pet_item(user_id: str, item: str) -> list:
     """Добавить аксессуар на питомца (заменить старый)"""
     # Может быть только один аксессуар
-    pet = db_update_pet_value(user_id, "PetInventory", json.dumps([item]))
-    inv = pet.get("PetInventory")
-    return json.loads(inv) if inv and isinstance(inv, str) else (inv if inv else [])
-
-def db_add_user_item(user_id: str, item: str) -> list:
+    async with _pool.writer() as db, db.execute(_SQL_SET_PET_ITEM, (item, user_id)) as cur:
+        row = await cur.fetchone()
+    pet = _cache_pet(user_id, row)
+    return _pet_items(pet) if pet else []
+
+async def db_remove_pet_item(user_id: str) -> list:
+    """Снять аксессуар с питомца"""
+    async with _pool.writer() as db, db.execute(_SQL_SET_PET_ITEM, (None, user_id)) as cur:
+        row = await cur.fetchone()
+    _cache_pet(user_id, row)
+    return []
+
+async def db_add_user_item(user_id: str, item: str) -> list:
     """Добавить предмет в инвентарь пользователя"""
-    inv = db_get_user_inventory(user_id)
-    inv.append(item)
-    pet = db_update_pet_value(user_id, "UserInventory", json.dumps(inv))
-    inv = pet.get("UserInventory")
-    return json.loads(inv) if inv and isinstance(inv, str) else (inv if inv else [])
+    async with _pool.writer() as db, db.execute(_SQL_ADD_USER_ITEM, (_item_bit(item), user_id)) as cur:
+        row = await cur.fetchone()
+    pet = _cache_pet(user_id, row)
+    return _user_items(pet) if pet else []
 
-def db_remove_user_item(user_id: str, item: str) -> list:
+async def db_remove_user_item(user_id: str, item: str) -> list:
     """Удалить предмет из инвентаря пользователя"""
-    inv = db_get_user_inventory(user_id)
-    if item in inv:
-        inv.remove(inv)
-    pet = db_update_pet_value(user_id, "UserInventory", json.dumps(inv))
-    inv = pet.get("UserInventory")
-    return json.loads(inv) if inv and isinstance(inv, str) else (inv if inv else [])
-
-def db_get_states(user_id: str) -> dict:
+    async with _pool.writer() as db, db.execute(_SQL_REMOVE_USER_ITEM, (_item_bit(item), user_id)) as cur:
+        row = await cur.fetchone()
+    pet = _cache_pet(user_id, row)
+    return _user_items(pet) if pet else []
+
+async def db_get_states(user_id: str) -> dict:
     """Получить состояния питомца"""
-    pet = db_get_pet(user_id)
+    pet = await db_get_pet(user_id)
     if not pet:
         return {}
     states = pet.get("states")
-    return json.loads(states) if states and isinstance(states, str) else (states if states else {})
+    return _loads(states) if states and isinstance(states, str) else (states if states else {})
 
-def db_set_states(user_id: str, states: dict) -> dict:
+async def db_set_states(user_id: str, states: dict) -> dict:
     """Установить состояния питомца"""
-    return db_update_pet_value(user_id, "states", json.dumps(states))
+    return await db_update_pet_value(user_id, "states", _dumps(states))
 
-def db_update_last_check(user_id: str, check_type: str):
+async def db_update_last_check(user_id: str, check_type: str):
     """Обновить время последней проверки"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        field = f"last_{check_type}_check"
-        cur.execute(f"UPDATE pets SET {field} = ? WHERE user_id = ?", 
-                   (datetime.now().isoformat(), user_id))
-        conn.commit()
-    finally:
-        conn.close()
+    sql = _SQL_UPDATE_LAST_CHECK.get(check_type)
+    if sql is None:
+        raise ValueError(f"Недопустимый тип проверки: {check_type}")
+    async with _pool.writer() as db:
+        await db.execute(sql, (int(time.time()), user_id))
+    _invalidate_pet(user_id)
 
 # ── Клавиатуры ──────────────────────────────────────────────────────────────
 
-def main_menu_kb() -> InlineKeyboardMarkup:
+class _FrozenKeyboard(InlineKeyboardMarkup):
+    """Клавиатура, которая не меняется после сборки: JSON для API считается один раз"""
+    _json: str | None = None
+
+    def to_json(self) -> str:
+        if self._json is None:
+            self._json = super().to_json()
+        return self._json
+
+def _build_main_menu_kb() -> InlineKeyboardMarkup:
     """Главное меню"""
-    kb = InlineKeyboardMarkup()
+    kb = _FrozenKeyboard()
     kb.add(
         InlineKeyboardButton("📰 Новости", callback_data="news_menu"),
         InlineKeyboardButton("🍖 Покормить", callback_data="feed"),
@@ -312,13 +646,12 @@ def main_menu_kb() -> InlineKeyboardMarkup:
     )
     return kb
 
-def news_menu_kb(user_id: None) -> InlineKeyboardMarkup:
-    """Меню выбора источника новостей"""
-    if user_id:
-        pet_inventory = db_get_pet_inventory(user_id)
-
-    kb = InlineKeyboardMarkup(row_width=2)
-    if "finance" in pet_inventory:
+# Меню новостей зависит только от надетых аксессуаров: для каждой маски
+# (3 бита — 8 вариантов) клавиатура собирается один раз
+@lru_cache(maxsize=1 << len(_ITEM_BITS))
+def _news_menu_for_mask(mask: int) -> InlineKeyboardMarkup:
+    kb = _FrozenKeyboard(row_width=2)
+    if mask & _ITEM_BITS["finance"]:
         kb.add(
             InlineKeyboardButton("📰 Экономика (RIA)", callback_data="news_ria_finance"),
             InlineKeyboardButton("🏛️ Политика (RIA)", callback_data="news_ria_politics"),
@@ -327,11 +660,11 @@ def news_menu_kb(user_id: None) -> InlineKeyboardMarkup:
             InlineKeyboardButton("💰 Бизнес (Forbes)", callback_data="news_forbes"),
             InlineKeyboardButton("🔄 Микс", callback_data="news_mix"),
         )
-    if "gaming" in pet_inventory:  
+    if mask & _ITEM_BITS["gaming"]:
         kb.add(
             InlineKeyboardButton("🎮 Игры (StopGame)", callback_data="news_stopgame")
         )
-    if "weather" in pet_inventory:
+    if mask & _ITEM_BITS["weather"]:
         kb.add(
             InlineKeyboardButton("🌤️ Погода", callback_data="weather")
         )
@@ -340,14 +673,23 @@ def news_menu_kb(user_id: None) -> InlineKeyboardMarkup:
     )
     return kb
 
-def shop_kb() -> InlineKeyboardMarkup:
+async def news_menu_kb(user_id: str, pet_inventory: list = None) -> InlineKeyboardMarkup:
+    """Меню выбора источника новостей"""
+    if pet_inventory is None:
+        pet_inventory = await db_get_pet_inventory(user_id)
+    mask = 0
+    for item in pet_inventory:
+        mask |= _ITEM_BITS.get(item, 0)
+    return _news_menu_for_mask(mask)
+
+def _build_shop_kb() -> InlineKeyboardMarkup:
     """Магазин аксессуаров"""
     accessories = [
         ("💰 Денежный свитер (100)", "buy_finance"),
         ("🎧 Геймерские наушники (100)", "buy_gaming"),
         ("☂️ Погодный зонтик (100)", "buy_weather"),
     ]
-    kb = InlineKeyboardMarkup()
+    kb = _FrozenKeyboard()
     for name, cb in accessories:
         kb.add(InlineKeyboardButton(name, callback_data=cb))
     kb.add(
@@ -355,10 +697,34 @@ def shop_kb() -> InlineKeyboardMarkup:
     )
     return kb
 
-def inventory_kb(user_id: str) -> InlineKeyboardMarkup:
+# Статичные клавиатуры собираются один раз и переиспользуются во всех ответах
+_MAIN_MENU_KB = _build_main_menu_kb()
+_SHOP_KB = _build_shop_kb()
+_STATUS_ONLY_KB = _FrozenKeyboard().add(InlineKeyboardButton("🐾 Статус", callback_data="status"))
+_STATUS_INVENTORY_KB = (_FrozenKeyboard()
+    .add(InlineKeyboardButton("🐾 Статус", callback_data="status"))
+    .add(InlineKeyboardButton("🎒 Инвентарь", callback_data="inventory")))
+_NEWS_INVENTORY_STATUS_KB = (_FrozenKeyboard()
+    .add(InlineKeyboardButton("📰 Новости", callback_data="news_menu"))
+    .add(InlineKeyboardButton("🎒 Инвентарь", callback_data="inventory"))
+    .add(InlineKeyboardButton("🐾 Статус", callback_data="status")))
+_SHOP_INVENTORY_STATUS_KB = (_FrozenKeyboard()
+    .add(InlineKeyboardButton("🏪 Магазин", callback_data="shop"))
+    .add(InlineKeyboardButton("🎒 Инвентарь", callback_data="inventory"))
+    .add(InlineKeyboardButton("🐾 Статус", callback_data="status")))
+_NEWS_STATUS_KB = (_FrozenKeyboard()
+    .add(InlineKeyboardButton("📰 Новости", callback_data="news_menu"))
+    .add(InlineKeyboardButton("🐾 Статус", callback_data="status")))
+_SHOP_INVENTORY_KB = (_FrozenKeyboard()
+    .add(InlineKeyboardButton("🏪 Магазин", callback_data="shop"))
+    .add(InlineKeyboardButton("🎒 Инвентарь", callback_data="inventory")))
+
+async def inventory_kb(user_id: str, pet: dict = None) -> InlineKeyboardMarkup:
     """Инвентарь с аксессуарами"""
-    items = db_get_user_inventory(user_id)
-    pet_inv = db_get_pet_inventory(user_id)
+    if pet is None:
+        pet = await db_get_pet(user_id) or {}
+    items = _user_items(pet)
+    pet_inv = _pet_items(pet)
     
     kb = InlineKeyboardMarkup()
     
@@ -375,9 +741,10 @@ def inventory_kb(user_id: str) -> InlineKeyboardMarkup:
     
     return kb
 
+@lru_cache(maxsize=None)
 def confirm_kb(action: str) -> InlineKeyboardMarkup:
-    """Подтверждение действия"""
-    kb = InlineKeyboardMarkup()
+    """Подтверждение действия (набор action фиксирован — клавиатура собирается один раз)"""
+    kb = _FrozenKeyboard()
     kb.add(
         InlineKeyboardButton("✅ Да", callback_data=f"confirm_{action}"),
         InlineKeyboardButton("❌ Нет", callback_data="cancel"),
@@ -386,35 +753,41 @@ def confirm_kb(action: str) -> InlineKeyboardMarkup:
 
 # ── Команды ──────────────────────────────────────────────────────────────────
 
+# У AsyncTeleBot нет register_next_step_handler: пользователи, от которых ждём
+# имя питомца, хранятся здесь, а следующее их сообщение получает create_pet
+_awaiting_name: set[int] = set()
+
 @bot.message_handler(commands=["start"])
-def cmd_start(message):
+async def cmd_start(message):
     """Запуск бота"""
     user_id = str(message.from_user.id)
-    pet = db_get_pet(user_id)
+    pet = await db_get_pet(user_id)
     
     if not pet:
-        msg = bot.send_message(
+        await bot.send_message(
             message.chat.id,
             "🎉 Добро пожаловать в <b>GigaPet</b>!\n\n"
             "Введи имя своего питомца:"
         )
-        bot.register_next_step_handler(msg, lambda m: create_pet(m))
+        _awaiting_name.add(message.from_user.id)
     else:
         text = f"😊 У тебя уже есть питомец, ты можешь сбросить его командой /reset"
-        bot.send_message(message.chat.id, text, reply_markup=InlineKeyboardMarkup().add(InlineKeyboardButton("🐾 Статус", callback_data="status")))
+        await bot.send_message(message.chat.id, text, reply_markup=_STATUS_ONLY_KB)
 
-def create_pet(message):
+@bot.message_handler(func=lambda m: m.from_user.id in _awaiting_name)
+async def create_pet(message):
     """Создание питомца"""
+    _awaiting_name.discard(message.from_user.id)
     user_id = str(message.from_user.id)
     name = message.text.strip()[:20]
     
     if not name:
-        bot.send_message(message.chat.id, "❌ Имя не может быть пустым!")
+        await bot.send_message(message.chat.id, "❌ Имя не может быть пустым!")
         return
     
-    pet = db_create_pet(user_id, name)
+    pet = await db_create_pet(user_id, name)
     if not pet:
-        bot.send_message(message.chat.id, "❌ Питомец уже существует!")
+        await bot.send_message(message.chat.id, "❌ Питомец уже существует!")
         return
     
     # Логируем создание питомца в группу
@@ -427,12 +800,10 @@ def create_pet(message):
                 f"👤 Пользователь: {user_mention} (id: {user_id})\n"
                 f"🏷️ Имя питомца: <b>{name}</b>"
             )
-            bot.send_message(LOGS_GROUP_ID, log_text)
+            await bot.send_message(LOGS_GROUP_ID, log_text)
         except Exception as e:
             logger.error(f"Ошибка отправки лога в группу: {e}")
     
-    img_path = IMG_CAT
-
     text = (
         f"✨ Питомец <b>{pet['name']}</b> создан!\n\n"
         f"💰 Монеты: {pet['money']}\n"
@@ -441,62 +812,54 @@ def create_pet(message):
         f"😊 Настроение: {pet['mood']}/100"
     )
     try:
-        with open(img_path, "rb") as img:
-            bot.send_photo(message.chat.id, img, caption=text, 
-                          reply_markup=main_menu_kb())
+        await send_static_photo(message.chat.id, IMG_CAT, caption=text,
+                                reply_markup=_MAIN_MENU_KB)
     except Exception as e:
         logger.error(f"Error sending photo: {e}")
-        bot.send_message(message.chat.id, text, reply_markup=main_menu_kb())
+        await bot.send_message(message.chat.id, text, reply_markup=_MAIN_MENU_KB)
 
 @bot.message_handler(commands=["adm"])
-def cmd_adm(message):
+async def cmd_adm(message):
     user_id = message.from_user.id
     if user_id not in ADMIN_USER_IDS:
-        bot.send_message(message.chat.id, "❌ У вас нет доступа к этой команде.")
+        await bot.send_message(message.chat.id, "❌ У вас нет доступа к этой команде.")
         return
     
-    bot.send_message(message.chat.id, message.chat.id)
+    await bot.send_message(message.chat.id, message.chat.id)
 
 @bot.message_handler(commands=["reset"])
-def cmd_reset(message):
+async def cmd_reset(message):
     """Удалить питомца"""
     user_id = str(message.from_user.id)
-    pet = db_get_pet(user_id)
+    pet = await db_get_pet(user_id)
     
     if not pet:
-        bot.send_message(message.chat.id, "❌ Питомца нет!")
+        await bot.send_message(message.chat.id, "❌ Питомца нет!")
         return
     
-    msg = bot.send_message(
+    msg = await bot.send_message(
         message.chat.id,
         f"⚠️ Удалить питомца <b>{pet['name']}</b>?",
         reply_markup=confirm_kb("delete_pet")
     )
 
-def db_reset_all_pets() -> int:
+async def db_reset_all_pets() -> int:
     """Сбросить характеристики всех питомцев (для /test)"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            UPDATE pets
-            SET satiety = 10, energy = 10, mood = 10, money = 500
-        """)
-        conn.commit()
-        return cur.rowcount
-    finally:
-        conn.close()
+    async with _pool.writer() as db, db.execute(_SQL_RESET_ALL_PETS) as cur:
+        count = cur.rowcount
+    _invalidate_pet()
+    return count
 
 @bot.message_handler(commands=["test"])
-def cmd_test(message):
+async def cmd_test(message):
     """Сбросить характеристики всех питомцев — только для администраторов"""
     user_id = message.from_user.id
     if user_id not in ADMIN_USER_IDS:
-        bot.send_message(message.chat.id, "❌ У вас нет доступа к этой команде.")
+        await bot.send_message(message.chat.id, "❌ У вас нет доступа к этой команде.")
         return
 
-    count = db_reset_all_pets()
-    bot.send_message(
+    count = await db_reset_all_pets()
+    await bot.send_message(
         message.chat.id,
         f"✅ Готово! Характеристики обновлены для <b>{count}</b> питомцев:\n"
         f"🍖 Сытость: 10\n"
@@ -506,13 +869,13 @@ def cmd_test(message):
     )
 
 @bot.message_handler(commands=["status"])
-def command_status(message):
+async def command_status(message):
     """Показать полный статус с картинкой"""
     user_id = str(message.from_user.id)
-    pet = db_get_pet(user_id)
+    pet = await db_get_pet(user_id)
     
     if not pet:
-        bot.send_message(message.chat.id, "❌ Питомец не найден")
+        await bot.send_message(message.chat.id, "❌ Питомец не найден")
         return
     
     state_icons = []
@@ -525,8 +888,8 @@ def command_status(message):
     if pet["mood"] <= 50:
         state_icons.append("mood")
 
-    pet_inventory = db_get_pet_inventory(user_id)
-    img = composite_cat_image(state_icons=state_icons, accessory=pet_inventory[0] if pet_inventory else None)
+    pet_inventory = _pet_items(pet)
+    accessory = pet_inventory[0] if pet_inventory else None
 
     text = (
         f"🐾 <b>{pet['name']}</b> {mood_emoji(pet['mood'])}\n\n"
@@ -538,23 +901,24 @@ def command_status(message):
     )
     
     try:
-        bot.send_photo(message.chat.id, img, caption=text, 
-                       reply_markup=main_menu_kb())
+        await send_cached_photo(message.chat.id, ("cat", accessory, tuple(state_icons)),
+                                lambda: composite_cat_image(state_icons=state_icons, accessory=accessory),
+                                caption=text, reply_markup=_MAIN_MENU_KB)
     except Exception as e:
         logger.error(f"Error sending photo: {e}")
-        bot.send_message(message.chat.id, text, reply_markup=main_menu_kb())
+        await bot.send_message(message.chat.id, text, reply_markup=_MAIN_MENU_KB)
 
 # ── Callback-хендлеры ────────────────────────────────────────────────────────
 
 @bot.callback_query_handler(func=lambda c: c.data == "menu")
-def cb_menu(call: CallbackQuery):
+async def cb_menu(call: CallbackQuery):
     """Главное меню"""
-    bot.answer_callback_query(call.id)
+    await bot.answer_callback_query(call.id)
     user_id = str(call.from_user.id)
-    pet = db_get_pet(user_id)
+    pet = await db_get_pet(user_id)
     
     if not pet:
-        bot.send_message(call.message.chat.id, "❌ Питомец не найден")
+        await bot.send_message(call.message.chat.id, "❌ Питомец не найден")
         return
     
     text = (
@@ -566,18 +930,18 @@ def cb_menu(call: CallbackQuery):
         f"{get_status_text(pet)}"
     )
     
-    safe_edit_or_send(call.message.chat.id, call.message.message_id, text,
-                     reply_markup=main_menu_kb())
+    await safe_edit_or_send(call.message.chat.id, call.message.message_id, text,
+                           reply_markup=_MAIN_MENU_KB)
 
 @bot.callback_query_handler(func=lambda c: c.data == "status")
-def cb_status(call: CallbackQuery):
+async def cb_status(call: CallbackQuery):
     """Показать полный статус с картинкой"""
-    bot.answer_callback_query(call.id)
+    await bot.answer_callback_query(call.id)
     user_id = str(call.from_user.id)
-    pet = db_get_pet(user_id)
+    pet = await db_get_pet(user_id)
     
     if not pet:
-        bot.send_message(call.message.chat.id, "❌ Питомец не найден")
+        await bot.send_message(call.message.chat.id, "❌ Питомец не найден")
         return
     
     state_icons = []
@@ -590,8 +954,8 @@ def cb_status(call: CallbackQuery):
     if pet["mood"] <= 50:
         state_icons.append("mood")
 
-    pet_inventory = db_get_pet_inventory(user_id)
-    img = composite_cat_image(state_icons=state_icons, accessory=pet_inventory[0] if pet_inventory else None)
+    pet_inventory = _pet_items(pet)
+    accessory = pet_inventory[0] if pet_inventory else None
 
     text = (
         f"🐾 <b>{pet['name']}</b> {mood_emoji(pet['mood'])}\n\n"
@@ -603,41 +967,37 @@ def cb_status(call: CallbackQuery):
     )
     
     try:
-        bot.send_photo(call.message.chat.id, img, caption=text, 
-                       reply_markup=main_menu_kb())
+        await send_cached_photo(call.message.chat.id, ("cat", accessory, tuple(state_icons)),
+                                lambda: composite_cat_image(state_icons=state_icons, accessory=accessory),
+                                caption=text, reply_markup=_MAIN_MENU_KB)
     except Exception as e:
         logger.error(f"Error sending photo: {e}")
-        bot.send_message(call.message.chat.id, text, reply_markup=main_menu_kb())
+        await bot.send_message(call.message.chat.id, text, reply_markup=_MAIN_MENU_KB)
 
 @bot.callback_query_handler(func=lambda c: c.data == "feed")
-def cb_feed(call: CallbackQuery):
+async def cb_feed(call: CallbackQuery):
     """Покормить питомца"""
-    bot.answer_callback_query(call.id)
+    await bot.answer_callback_query(call.id)
     user_id = str(call.from_user.id)
-    pet = db_get_pet(user_id)
     
-    if not pet:
-        bot.send_message(call.message.chat.id, "❌ Питомец не найден")
+    # Кормим: -1 монета, +10 сытости. Проверки — в самом UPDATE;
+    # строка питомца читается, только чтобы объяснить отказ
+    pet = await db_apply_delta(user_id, d_money=-1, d_satiety=10, require_money=1, satiety_below=100)
+    if pet is None:
+        pet = await db_get_pet(user_id)
+        if pet is None:
+            await bot.send_message(call.message.chat.id, "❌ Питомец не найден")
+        elif pet["satiety"] >= 100:
+            try:
+                await send_static_photo(call.message.chat.id, IMG_CAT,
+                                        caption="🍖 Твой питомец уже наелся!")
+            except Exception as e:
+                logger.error(f"Error sending photo: {e}")
+                await bot.send_message(call.message.chat.id, "🍖 Твой питомец уже наелся!")
+        else:
+            await bot.send_message(call.message.chat.id, "💸 Нет денег! Нужна 1 монета")
         return
     
-    if pet["satiety"] >= 100:
-        try:
-            with open(IMG_CAT, "rb") as img:
-                bot.send_photo(call.message.chat.id, img,
-                              caption="🍖 Твой питомец уже наелся!")
-        except Exception as e:
-            logger.error(f"Error sending photo: {e}")
-            bot.send_message(call.message.chat.id, "🍖 Твой питомец уже наелся!")
-        return
-    
-    if pet["money"] < 1:
-        bot.send_message(call.message.chat.id, "💸 Нет денег! Нужна 1 монета")
-        return
-    
-    # Кормим: -1 монета, +10 сытости
-    pet = db_add_money(user_id, -1)
-    pet = db_apply_minus(user_id, satiety_n=-10)
-    
     text = (
         f"🍖 Ты покормил <b>{pet['name']}</b>!\n\n"
         f"💰 -1 монета (осталось: {pet['money']})\n"
@@ -646,55 +1006,43 @@ def cb_feed(call: CallbackQuery):
     
     # Отправляем действие с картинкой еды
     try:
-        pet_inventory = db_get_pet_inventory(user_id)
-        action_img = get_action_image("food", pet_inventory)
-        bot.send_photo(call.message.chat.id, action_img, caption=text,
-                      reply_markup=main_menu_kb())
+        pet_inventory = _pet_items(pet)
+        accessory = pet_inventory[0] if pet_inventory else None
+        await send_cached_photo(call.message.chat.id, ("action", "food", accessory),
+                                lambda: get_action_image("food", pet_inventory),
+                                caption=text, reply_markup=_MAIN_MENU_KB)
     except Exception as e:
         logger.error(f"Error with action image: {e}")
         try:
-            with open(IMG_FOOD, "rb") as img:
-                bot.send_photo(call.message.chat.id, img, caption=text,
-                              reply_markup=main_menu_kb())
+            await send_static_photo(call.message.chat.id, IMG_FOOD, caption=text,
+                                   reply_markup=_MAIN_MENU_KB)
         except:
-            bot.send_message(call.message.chat.id, text, reply_markup=main_menu_kb())
+            await bot.send_message(call.message.chat.id, text, reply_markup=_MAIN_MENU_KB)
 
 @bot.callback_query_handler(func=lambda c: c.data == "play")
-def cb_play(call: CallbackQuery):
+async def cb_play(call: CallbackQuery):
     """Поиграть с питомцем"""
-    bot.answer_callback_query(call.id)
+    await bot.answer_callback_query(call.id)
     user_id = str(call.from_user.id)
-    pet = db_get_pet(user_id)
-    
-    if not pet:
-        bot.send_message(call.message.chat.id, "❌ Питомец не найден")
-        return
-    
-    if pet["mood"] >= 100:
-        try:
-            with open(IMG_CAT, "rb") as img:
-                bot.send_photo(call.message.chat.id, img,
-                              caption="🎮 Твой питомец уже наигрался!")
-        except Exception as e:
-            logger.error(f"Error sending photo: {e}")
-            bot.send_message(call.message.chat.id, "🎮 Твой питомец уже наигрался!")
-        return
     
-    if pet["energy"] < 10:
+    # Играем: -10 энергии, +10 настроения, +5 монет
+    pet = await db_apply_delta(user_id, d_money=5, d_energy=-10, d_mood=10, require_energy=10, mood_below=100)
+    if pet is None:
+        pet = await db_get_pet(user_id)
+        if pet is None:
+            await bot.send_message(call.message.chat.id, "❌ Питомец не найден")
+            return
+        if pet["mood"] >= 100:
+            img, caption = IMG_CAT, "🎮 Твой питомец уже наигрался!"
+        else:
+            img, caption = IMG_CAT_LOW_ENERGY, "⚡ Питомцу не хватает энергии для игры!"
         try:
-            with open(IMG_CAT_LOW_ENERGY, "rb") as img:
-                bot.send_photo(call.message.chat.id, img,
-                              caption="⚡ Питомцу не хватает энергии для игры!")
+            await send_static_photo(call.message.chat.id, img, caption=caption)
         except Exception as e:
             logger.error(f"Error sending photo: {e}")
-            bot.send_message(call.message.chat.id, "⚡ Питомцу не хватает энергии для игры!")
+            await bot.send_message(call.message.chat.id, caption)
         return
     
-    # Играем: -10 энергии, +10 настроения, +5 монет
-    pet = db_apply_minus(user_id, energy_n=10)
-    pet = db_apply_minus(user_id, mood_n=-10)  # Отрицательное значение = прибавление
-    pet = db_add_money(user_id, 5)
-    
     text = (
         f"🎮 Ты поиграл с <b>{pet['name']}</b>!\n\n"
         f"⚡ -10 энергии (осталось: {pet['energy']}/100)\n"
@@ -704,68 +1052,66 @@ def cb_play(call: CallbackQuery):
     
     # Отправляем действие с картинкой игры
     try:
-        pet_inventory = db_get_pet_inventory(user_id)
-        action_img = get_action_image("game", pet_inventory)
-        bot.send_photo(call.message.chat.id, action_img, caption=text,
-                      reply_markup=main_menu_kb())
+        pet_inventory = _pet_items(pet)
+        accessory = pet_inventory[0] if pet_inventory else None
+        await send_cached_photo(call.message.chat.id, ("action", "game", accessory),
+                                lambda: get_action_image("game", pet_inventory),
+                                caption=text, reply_markup=_MAIN_MENU_KB)
     except Exception as e:
         logger.error(f"Error with action image: {e}")
         try:
-            with open(IMG_GAME, "rb") as img:
-                bot.send_photo(call.message.chat.id, img, caption=text,
-                              reply_markup=main_menu_kb())
+            await send_static_photo(call.message.chat.id, IMG_GAME, caption=text,
+                                   reply_markup=_MAIN_MENU_KB)
         except:
-            bot.send_message(call.message.chat.id, text, reply_markup=main_menu_kb())
+            await bot.send_message(call.message.chat.id, text, reply_markup=_MAIN_MENU_KB)
 
 @bot.callback_query_handler(func=lambda c: c.data == "sleep")
-def cb_sleep(call: CallbackQuery):
+async def cb_sleep(call: CallbackQuery):
     """Отдых питомца (восстановление энергии)"""
-    bot.answer_callback_query(call.id)
+    await bot.answer_callback_query(call.id)
     user_id = str(call.from_user.id)
-    pet = db_get_pet(user_id)
-    
-    if not pet:
-        bot.send_message(call.message.chat.id, "❌ Питомец не найден")
+    # Восстановление считается прямо в UPDATE по текущей сытости;
+    # строка питомца читается, только чтобы объяснить отказ
+    pet = await db_sleep(user_id)
+    if pet is None:
+        pet = await db_get_pet(user_id)
+        if pet is None:
+            await bot.send_message(call.message.chat.id, "❌ Питомец не найден")
+        else:
+            await send_static_photo(call.message.chat.id, IMG_CAT,
+                                   caption="⚡ Питомец уже полон энергии!")
         return
     
-    if pet["energy"] >= 100:
-        with open(IMG_CAT, "rb") as img:
-                bot.send_photo(call.message.chat.id, img,
-                              caption="⚡ Питомец уже полон энергии!")
-        return
-    
-    # Рассчитываем восстановление: 10 * (сытость / 100)
-    recovery = int(10 * (pet["satiety"] / 100))
-    if recovery < 1:
-        recovery = 1
-    
-    new_energy = min(100, pet["energy"] + recovery)
-    delta = new_energy - pet["energy"]
-    
-    pet = db_update_pet_value(user_id, "energy", new_energy)
+    # RETURNING отдаёт только новые значения: если энергия упёрлась в 100,
+    # точный прирост неизвестен, и он не показывается
+    if pet["energy"] < 100:
+        energy_line = f"⚡ +{max(1, 10 * pet['satiety'] // 100)} энергии (осталось: {pet['energy']}/100)"
+    else:
+        energy_line = "⚡ Энергия восполнена: 100/100"
     
     text = (
         f"💤 <b>{pet['name']}</b> поспал!\n\n"
-        f"⚡ +{delta} энергии (осталось: {pet['energy']}/100)"
+        f"{energy_line}"
     )
     try:
-        pet_inventory = db_get_pet_inventory(user_id)
-        action_img = get_action_image("sleep", pet_inventory)
-        bot.send_photo(call.message.chat.id, action_img, caption=text,
-                      reply_markup=main_menu_kb())
+        pet_inventory = _pet_items(pet)
+        accessory = pet_inventory[0] if pet_inventory else None
+        await send_cached_photo(call.message.chat.id, ("action", "sleep", accessory),
+                                lambda: get_action_image("sleep", pet_inventory),
+                                caption=text, reply_markup=_MAIN_MENU_KB)
     except Exception as e:
         logger.error(f"Error sending photo: {e}")
-        bot.send_message(call.message.chat.id, text, reply_markup=main_menu_kb())
+        await bot.send_message(call.message.chat.id, text, reply_markup=_MAIN_MENU_KB)
 
 @bot.callback_query_handler(func=lambda c: c.data == "shop")
-def cb_shop(call: CallbackQuery):
+async def cb_shop(call: CallbackQuery):
     """Магазин аксессуаров"""
-    bot.answer_callback_query(call.id)
+    await bot.answer_callback_query(call.id)
     user_id = str(call.from_user.id)
-    pet = db_get_pet(user_id)
+    pet = await db_get_pet(user_id)
     
     if not pet:
-        bot.send_message(call.message.chat.id, "❌ Питомец не найден")
+        await bot.send_message(call.message.chat.id, "❌ Питомец не найден")
         return
     
     text = (
@@ -773,35 +1119,33 @@ def cb_shop(call: CallbackQuery):
         f"💰 У вас: {pet['money']} монет\n\n"
         f"Каждый аксессуар стоит <b>100 монет</b>"
     )
-    safe_edit_or_send(call.message.chat.id, call.message.message_id, text,
-                     reply_markup=shop_kb())
+    await safe_edit_or_send(call.message.chat.id, call.message.message_id, text,
+                           reply_markup=_SHOP_KB)
 
 @bot.callback_query_handler(func=lambda c: c.data.startswith("buy_"))
-def cb_buy(call: CallbackQuery):
+async def cb_buy(call: CallbackQuery):
     """Купить аксессуар"""
-    bot.answer_callback_query(call.id)
+    await bot.answer_callback_query(call.id)
     user_id = str(call.from_user.id)
     item = call.data.replace("buy_", "")
     
-    pet = db_get_pet(user_id)
-    if not pet:
-        bot.send_message(call.message.chat.id, "❌ Питомец не найден")
+    # Устаревшая или чужая кнопка buy_*: такого предмета в _ITEM_BITS нет
+    if item not in _ITEM_BITS:
+        await bot.send_message(call.message.chat.id, "❌ Неизвестный предмет", reply_markup=_SHOP_KB)
         return
     
-    if pet["money"] < 100:
-        bot.send_message(call.message.chat.id, "💸 Недостаточно монет! Нужно 100")
+    # Покупаем: списание и добавление предмета — один UPDATE
+    pet = await db_buy_item(user_id, item, 100)
+    if pet is None:
+        pet = await db_get_pet(user_id)
+        if pet is None:
+            await bot.send_message(call.message.chat.id, "❌ Питомец не найден")
+        elif pet["money"] < 100:
+            await bot.send_message(call.message.chat.id, "💸 Недостаточно монет! Нужно 100")
+        else:
+            await bot.send_message(call.message.chat.id, "✅ Этот аксессуар уже у вас!")
         return
     
-    # Проверяем есть ли уже такой предмет
-    user_items = db_get_user_inventory(user_id)
-    if item in user_items:
-        bot.send_message(call.message.chat.id, "✅ Этот аксессуар уже у вас!")
-        return
-    
-    # Покупаем
-    pet = db_add_money(user_id, -100)
-    db_add_user_item(user_id, item)
-    
     names = {
         "finance": "💰 Денежный свитер",
         "gaming": "🎧 Геймерские наушники",
@@ -812,102 +1156,139 @@ def cb_buy(call: CallbackQuery):
         f"✅ Куплено: <b>{names.get(item, item)}</b>\n\n"
         f"💰 -100 монет (осталось: {pet['money']})"
     )
-    bot.send_message(call.message.chat.id, text, reply_markup=shop_kb())
+    await bot.send_message(call.message.chat.id, text, reply_markup=_SHOP_KB)
 
 @bot.callback_query_handler(func=lambda c: c.data == "inventory")
-def cb_inventory(call: CallbackQuery):
+async def cb_inventory(call: CallbackQuery):
     """Инвентарь с аксессуарами"""
-    bot.answer_callback_query(call.id)
+    await bot.answer_callback_query(call.id)
     user_id = str(call.from_user.id)
-    items = db_get_user_inventory(user_id)
+    pet = await db_get_pet(user_id) or {}
+    items = _user_items(pet)
     
     if not items:
-        bot.send_message(call.message.chat.id, "🎒 Инвентарь пуст", reply_markup=InlineKeyboardMarkup()
-                         .add(InlineKeyboardButton("🐾 Статус", callback_data="status")))
+        await bot.send_message(call.message.chat.id, "🎒 Инвентарь пуст", reply_markup=_STATUS_ONLY_KB)
         return
     
     text = (
         f"🎒 <b>Инвентарь</b>\n\n"
         f"Нажми на аксессуар, чтобы надеть его:"
     )
-    safe_edit_or_send(call.message.chat.id, call.message.message_id, text,
-                     reply_markup=inventory_kb(user_id))
+    await safe_edit_or_send(call.message.chat.id, call.message.message_id, text,
+                           reply_markup=await inventory_kb(user_id, pet))
 
 @bot.callback_query_handler(func=lambda c: c.data.startswith("wear_"))
-def cb_wear(call: CallbackQuery):
+async def cb_wear(call: CallbackQuery):
     """Надеть аксессуар"""
-    bot.answer_callback_query(call.id)
+    await bot.answer_callback_query(call.id)
     user_id = str(call.from_user.id)
     item = call.data.replace("wear_", "")
     
-    pet_inventory = db_get_pet_inventory(user_id)
+    pet_inventory = await db_get_pet_inventory(user_id)
 
     if item in pet_inventory:
         # Снимаем
-        db_update_pet_value(user_id, "PetInventory", json.dumps([]))
-        with open(IMG_CAT, "rb") as img:
-            bot.send_photo(call.message.chat.id, img, caption="✅ Аксессуар снят", reply_markup=(InlineKeyboardMarkup()
-                            .add(InlineKeyboardButton("🐾 Статус", callback_data="status"))
-                            .add(InlineKeyboardButton("🎒 Инвентарь", callback_data="inventory"))))
+        await db_remove_pet_item(user_id)
+        await send_static_photo(call.message.chat.id, IMG_CAT, caption="✅ Аксессуар снят", reply_markup=_STATUS_INVENTORY_KB)
     else:
         # Надеваем
-        db_add_pet_item(user_id, item)
-        img = composite_cat_image(accessory=item)
-        bot.send_photo(call.message.chat.id, img, caption="✅ Аксессуар надет", reply_markup=((InlineKeyboardMarkup()
-                         .add(InlineKeyboardButton("📰 Новости", callback_data="news_menu"))
-                         .add(InlineKeyboardButton("🎒 Инвентарь", callback_data="inventory"))))
-                         .add(InlineKeyboardButton("🐾 Статус", callback_data="status")))
+        await db_add_pet_item(user_id, item)
+        await send_cached_photo(call.message.chat.id, ("cat", item, ()), lambda: composite_cat_image(accessory=item),
+                                caption="✅ Аксессуар надет", reply_markup=_NEWS_INVENTORY_STATUS_KB)
     
-    cb_inventory(call)
+    await cb_inventory(call)
 
 @bot.callback_query_handler(func=lambda c: c.data == "news_menu")
-def cb_news_menu(call: CallbackQuery):
+async def cb_news_menu(call: CallbackQuery):
     """Меню новостей"""
-    bot.answer_callback_query(call.id)
+    await bot.answer_callback_query(call.id)
 
-    pet_inventory = db_get_pet_inventory(call.from_user.id)
+    pet_inventory = await db_get_pet_inventory(call.from_user.id)
     
     if not pet_inventory:
-        bot.send_message(call.message.chat.id, "❌ У вас нет аксессуаров! Купите их в магазине, чтобы открывать новости.", 
-                          reply_markup=((InlineKeyboardMarkup()
-                          .add(InlineKeyboardButton("🏪 Магазин", callback_data="shop"))
-                          .add(InlineKeyboardButton("🎒 Инвентарь", callback_data="inventory"))))
-                          .add(InlineKeyboardButton("🐾 Статус", callback_data="status")))
+        await bot.send_message(call.message.chat.id, "❌ У вас нет аксессуаров! Купите их в магазине, чтобы открывать новости.", 
+                                reply_markup=_SHOP_INVENTORY_STATUS_KB)
         return
     text = "📰 Давайте почитаем что происходит в мире!\n\n📌 Выбери источник новостей:"
-    safe_edit_or_send(call.message.chat.id, call.message.message_id, text,
-                     reply_markup=news_menu_kb(call.from_user.id))
+    await safe_edit_or_send(call.message.chat.id, call.message.message_id, text,
+                           reply_markup=await news_menu_kb(call.from_user.id, pet_inventory))
+
+# Погода одна на всех (Ростов-на-Дону): ответ Open-Meteo + реакция AI живут WEATHER_CACHE_TTL секунд,
+# параллельные нажатия при промахе ждут один и тот же запрос под _weather_lock
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+_weather_cache = {"data": None, "expires": 0.0}
+_weather_lock = asyncio.Lock()
+
+async def cached_weather() -> dict:
+    """Погода с реакцией из кэша; запрос к API — не чаще раза в WEATHER_CACHE_TTL"""
+    if time.monotonic() < _weather_cache["expires"]:
+        return _weather_cache["data"]
+    async with _weather_lock:
+        if time.monotonic() < _weather_cache["expires"]:
+            return _weather_cache["data"]
+        data = await get_weather_reaction()
+        _weather_cache.update(data=data, expires=time.monotonic() + WEATHER_CACHE_TTL)
+        return data
+
+# Ленты обновляются медленно: новости кэшируются по источнику на NEWS_CACHE_TTL секунд,
+# промахи по одному источнику ждут общий запрос под своим замком
+NEWS_CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL", "600"))
+_news_cache: dict[str, tuple[float, list]] = {}
+_news_locks: dict[str, asyncio.Lock] = {}
 
 async def _fetch_news_and_update(user_id: str, source: str):
-    """Получить новости и обновить питомца"""
-    try:
-        news_list = await get_news_with_reaction(count=1, source=source)
+    """Получить новости (из кэша источника, если он ещё свежий)"""
+    cached = _news_cache.get(source)
+    if cached and time.monotonic() < cached[0]:
+        return cached[1]
+    async with _news_locks.setdefault(source, asyncio.Lock()):
+        cached = _news_cache.get(source)
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
+        try:
+            news_list = await get_news_with_reaction(count=1, source=source)
+        except Exception as e:
+            logger.error(f"❌ Ошибка новостей: {e}")
+            return []
+        # Пустой ответ не кэшируется: следующий клик попробует снова
+        if news_list:
+            _news_cache[source] = (time.monotonic() + NEWS_CACHE_TTL, news_list)
         return news_list
-    except Exception as e:
-        logger.error(f"❌ Ошибка новостей: {e}")
-        return []
 
-def _send_news_async(chat_id: int, user_id: str, source: str, call: CallbackQuery = None):
-    """Отправить новости (обёртка для async)"""
+# Постоянные части текста новостей и погоды
+SOURCE_ICONS = {
+    "ria": "📰",
+    "stopgame": "🎮",
+    "forbes": "💰",
+    "mix": "🔄",
+}
+
+def weather_emoji(weather: dict) -> str:
+    """Значок погоды в заголовке сообщения"""
+    return "☀️" if weather.get("is_sunny") else "🌧️" if weather.get("is_rain") else "⛅"
+
+async def _send_news_async(chat_id: int, user_id: str, source: str, call: CallbackQuery = None, pet: dict = None):
+    """Отправить новости (pet — уже прочитанная вызывающим строка питомца)"""
     user_id_str = str(user_id)
-    pet = db_get_pet(user_id_str)
+    if pet is None:
+        pet = await db_get_pet(user_id_str)
     
     if not pet:
-        bot.send_message(chat_id, "❌ Питомец не найден")
+        await bot.send_message(chat_id, "❌ Питомец не найден")
         return
     
     msg_id = call.message.message_id if call else None
     
     # Получаем новости
     try:
-        news_list = asyncio.run(_fetch_news_and_update(user_id_str, source))
+        news_list = await _fetch_news_and_update(user_id_str, source)
     except Exception as e:
         logger.error(f"Error: {e}")
-        bot.send_message(chat_id, f"❌ Ошибка: {str(e)[:100]}")
+        await bot.send_message(chat_id, f"❌ Ошибка: {str(e)[:100]}")
         return
     
     if not news_list:
-        bot.send_message(chat_id, "🤷 Новостей не найдено")
+        await bot.send_message(chat_id, "🤷 Новостей не найдено")
         return
     
     # Обновляем настроение
@@ -915,23 +1296,14 @@ def _send_news_async(chat_id: int, user_id: str, source: str, call: CallbackQuer
     for n in news_list:
         total_mood_change += n.get("mood_change", 0)
     
-    pet = db_apply_minus(user_id_str, mood_n=-total_mood_change)
+    pet = await db_apply_minus(user_id_str, mood_n=-total_mood_change)
     
 
     # Формируем текст
-    source_icon = {
-        "ria": "📰",
-        "stopgame": "🎮",
-        "forbes": "💰",
-        "mix": "🔄"
-    }.get(source, "📰")
-    
-    is_positive = total_mood_change > 0
-    sign = "📈" if is_positive else "📉"
-    mood_str = f"+{total_mood_change}" if total_mood_change >= 0 else str(total_mood_change)
+    sign = "📈" if total_mood_change > 0 else "📉"
     
     lines = [
-        f"{source_icon} <b>Новости</b>\n",
+        f"{SOURCE_ICONS.get(source, '📰')} <b>Новости</b>\n",
         f"🐾 <b>{pet['name']}</b> {mood_emoji(pet['mood'])}\n",
     ]
     
@@ -941,129 +1313,127 @@ def _send_news_async(chat_id: int, user_id: str, source: str, call: CallbackQuer
         lines.append(f"<b>{title_safe}</b>")
         lines.append(f"<i>{reaction}</i>\n")
     
-    lines.append(f"\n{sign} Настроение: {mood_str} → {pet['mood']}/100")
+    lines.append(f"\n{sign} Настроение: {total_mood_change:+d} → {pet['mood']}/100")
     
     text = "\n".join(lines)
     
     if msg_id:
-        safe_edit_or_send(chat_id, msg_id, text, reply_markup=(InlineKeyboardMarkup()
-                         .add(InlineKeyboardButton("📰 Новости", callback_data="news_menu"))
-                         .add(InlineKeyboardButton("🐾 Статус", callback_data="status"))))
+        await safe_edit_or_send(chat_id, msg_id, text, reply_markup=_NEWS_STATUS_KB)
     else:
-        bot.send_message(chat_id, text, reply_markup=(InlineKeyboardMarkup()
-                         .add(InlineKeyboardButton("📰 Новости", callback_data="news_menu"))
-                         .add(InlineKeyboardButton("🐾 Статус", callback_data="status"))))
+        await bot.send_message(chat_id, text, reply_markup=_NEWS_STATUS_KB)
 
 @bot.callback_query_handler(func=lambda c: c.data.startswith("news_"))
-def cb_news(call: CallbackQuery):
+async def cb_news(call: CallbackQuery):
     """Получить новости"""
+    # Сначала гасим «часики» на кнопке: дальше идут БД и сеть
+    await bot.answer_callback_query(call.id)
 
-    pet_inventory = db_get_pet_inventory(call.message.chat.id)
+    pet = await db_get_pet(str(call.from_user.id))
+    pet_inventory = _pet_items(pet) if pet else []
 
     available_sources = {
         "finance": ["ria_finance", "ria_politics", "forbes", "mix"],
         "gaming": ["stopgame"],
     }
 
-    bot.answer_callback_query(call.id)
     source = call.data.replace("news_", "")
 
     if not pet_inventory  or pet_inventory[0] == "weather" or source not in available_sources[pet_inventory[0]]:  # Проверяем, что источник доступен для текущего аксессуара
-        safe_edit_or_send(call.message.chat.id, call.message.message_id, "❌ Этот источник недоступен. Купите соответствующий аксессуар в магазине или наденьте его.", 
-                          reply_markup=(InlineKeyboardMarkup()
-                          .add(InlineKeyboardButton("🏪 Магазин", callback_data="shop"))
-                          .add(InlineKeyboardButton("🎒 Инвентарь", callback_data="inventory"))))
+        await safe_edit_or_send(call.message.chat.id, call.message.message_id, "❌ Этот источник недоступен. Купите соответствующий аксессуар в магазине или наденьте его.", 
+                                reply_markup=_SHOP_INVENTORY_KB)
         return
         
-    safe_edit_or_send(call.message.chat.id, call.message.message_id, "⏳ Получаем новости...", reply_markup=None)
-    _send_news_async(call.message.chat.id, call.from_user.id, source, call)
+    await safe_edit_or_send(call.message.chat.id, call.message.message_id, "⏳ Получаем новости...", reply_markup=None)
+    await _send_news_async(call.message.chat.id, call.from_user.id, source, call, pet)
 
-def _send_weather_async(chat_id: int, user_id: str, call: CallbackQuery = None):
-    """Отправить погоду (обёртка для async)"""
+async def _send_weather_async(chat_id: int, user_id: str, call: CallbackQuery = None, pet: dict = None):
+    """Отправить погоду (права на источник проверяет cb_weather)"""
     user_id_str = str(user_id)
-    pet = db_get_pet(user_id_str)
-    
-    if not pet:
-        bot.send_message(chat_id, "❌ Питомец не найден")
-        return
-    
-    pet_inventory = db_get_pet_inventory(call.message.chat.id)
-
-    bot.answer_callback_query(call.id)
-
-    if not pet_inventory or pet_inventory[0] != "weather":  # Проверяем, что источник доступен для текущего аксессуара
-        safe_edit_or_send(call.message.chat.id, call.message.message_id, "❌ Этот источник недоступен. Купите соответствующий аксессуар в магазине или наденьте его.", 
-                          reply_markup=(InlineKeyboardMarkup()
-                          .add(InlineKeyboardButton("🏪 Магазин", callback_data="shop"))
-                          .add(InlineKeyboardButton("🎒 Инвентарь", callback_data="inventory"))))
-        return
+    if pet is None:
+        pet = await db_get_pet(user_id_str)
+        if not pet:
+            await bot.send_message(chat_id, "❌ Питомец не найден")
+            return
 
     msg_id = call.message.message_id if call else None
     
     # Получаем погоду
     try:
         
-        weather_data = asyncio.run(get_weather_reaction())
+        weather_data = await cached_weather()
     except Exception as e:
         logger.error(f"Weather error: {e}")
-        bot.send_message(chat_id, f"❌ Ошибка погоды: {str(e)[:100]}")
+        await bot.send_message(chat_id, f"❌ Ошибка погоды: {str(e)[:100]}")
         return
     
     # Обновляем настроение
-    pet = db_apply_minus(user_id_str, mood_n=-weather_data.get("mood_change", 0))
+    mood_change = weather_data.get("mood_change", 0)
+    pet = await db_apply_minus(user_id_str, mood_n=-mood_change)
     
     # Формируем текст
-    is_positive = weather_data.get("is_positive", False)
-    sign = "📈" if is_positive else "📉"
-    mood_str = f"+{weather_data.get('mood_change', 0)}" if weather_data.get('mood_change', 0) >= 0 else str(weather_data.get('mood_change', 0))
-    
-    emoji = "☀️" if weather_data.get("is_sunny") else "🌧️" if weather_data.get("is_rain") else "⛅"
+    sign = "📈" if weather_data.get("is_positive", False) else "📉"
     
     text = (
-        f"{emoji} <b>Погода в Ростове-на-Дону</b>\n\n"
+        f"{weather_emoji(weather_data)} <b>Погода в Ростове-на-Дону</b>\n\n"
         f"🌡️ Температура: {weather_data.get('temp')}°C (ощущается {weather_data.get('feels_like')}°C)\n"
         f"💨 Ветер: {weather_data.get('wind')} м/с\n"
         f"💧 Влажность: {weather_data.get('humidity')}%\n\n"
         f"<b>{pet['name']}</b> говорит: <i>{weather_data.get('reaction', 'Хм...')}</i>\n\n"
-        f"{sign} Настроение: {mood_str} → {pet['mood']}/100 {mood_emoji(pet['mood'])}"
+        f"{sign} Настроение: {mood_change:+d} → {pet['mood']}/100 {mood_emoji(pet['mood'])}"
     )
     
     if msg_id:
-        safe_edit_or_send(chat_id, msg_id, text, reply_markup=(InlineKeyboardMarkup()
-                         .add(InlineKeyboardButton("📰 Новости", callback_data="news_menu"))
-                         .add(InlineKeyboardButton("🐾 Статус", callback_data="status"))))
+        await safe_edit_or_send(chat_id, msg_id, text, reply_markup=_NEWS_STATUS_KB)
     else:
-        bot.send_message(chat_id, text, reply_markup=(InlineKeyboardMarkup()
-                         .add(InlineKeyboardButton("📰 Новости", callback_data="news_menu"))
-                         .add(InlineKeyboardButton("🐾 Статус", callback_data="status"))))
+        await bot.send_message(chat_id, text, reply_markup=_NEWS_STATUS_KB)
 
 @bot.callback_query_handler(func=lambda c: c.data == "weather")
-def cb_weather(call: CallbackQuery):
+async def cb_weather(call: CallbackQuery):
     """Получить информацию о погоде"""
-    bot.answer_callback_query(call.id)
-    _send_weather_async(call.message.chat.id, call.from_user.id, call)
+    await bot.answer_callback_query(call.id)
+    pet = await db_get_pet(str(call.from_user.id))
+
+    if not pet:
+        await bot.send_message(call.message.chat.id, "❌ Питомец не найден")
+        return
+
+    if pet.get("pet_inv_item") != "weather":  # Погода доступна только с надетым зонтиком
+        await safe_edit_or_send(call.message.chat.id, call.message.message_id, "❌ Этот источник недоступен. Купите соответствующий аксессуар в магазине или наденьте его.", 
+                                reply_markup=_SHOP_INVENTORY_KB)
+        return
+
+    await _send_weather_async(call.message.chat.id, call.from_user.id, call, pet)
 
 @bot.callback_query_handler(func=lambda c: c.data == "confirm_delete_pet")
-def cb_confirm_delete(call: CallbackQuery):
+async def cb_confirm_delete(call: CallbackQuery):
     """Подтвердить удаление питомца"""
-    bot.answer_callback_query(call.id)
+    await bot.answer_callback_query(call.id)
     user_id = str(call.from_user.id)
     
-    if db_delete_pet(user_id):
-        bot.send_message(call.message.chat.id, "✅ Питомец удален. Используй /start для создания нового")
+    if await db_delete_pet(user_id):
+        await bot.send_message(call.message.chat.id, "✅ Питомец удален. Используй /start для создания нового")
     else:
-        bot.send_message(call.message.chat.id, "❌ Ошибка при удалении")
+        await bot.send_message(call.message.chat.id, "❌ Ошибка при удалении")
 
 @bot.callback_query_handler(func=lambda c: c.data == "cancel")
-def cb_cancel(call: CallbackQuery):
+async def cb_cancel(call: CallbackQuery):
     """Отмена"""
-    bot.answer_callback_query(call.id)
-    cb_menu(call)
+    await bot.answer_callback_query(call.id)
+    await cb_menu(call)
 
 # ── Основной loop ────────────────────────────────────────────────────────────
 
+async def main():
+    await open_db_pool()
+    # Массовые обновления tasks.py идут мимо db_*: после них кэш питомцев сбрасывается целиком
+    start_background_tasks(bot, on_pets_changed=_invalidate_pet)
+    logger.info("🚀 кит бот запущен...")
+    try:
+        await bot.infinity_polling(logger_level=logging.INFO)
+    finally:
+        await close_http_client()
+        await _pool.close()
+
 if __name__ == "__main__":
     init_db()
-    start_background_tasks(bot)
-    logger.info("🚀 кит бот запущен...")
-    bot.infinity_polling(logger_level=logging.INFO)
+    asyncio.run(main())
@@ -5,6 +5,7 @@ image_utils.py — утилиты для работы с картинками (
 
 from PIL import Image
 from pathlib import Path
+from functools import lru_cache
 import io
 
 IMAGES_DIR = Path("Images")
@@ -12,6 +13,45 @@ IMAGES_DIR = Path("Images")
 # Коэффициент оптимизации для Telegram (уменьшаем до 512x512)
 COMPRESS_SCALE = 512 / 1000
 
+# Параметры кодирования: Telegram всё равно перекодирует фото в JPEG, поэтому
+# долгий optimize=True (~100 мс на кадр) не нужен — compress_level=1 даёт ~15 мс
+SAVE_PARAMS = {"format": "PNG", "compress_level": 1}
+
+
+def _load_layers() -> dict:
+    """
+    Декодирует все PNG из IMAGES_DIR один раз: имя файла без расширения -> RGBA.
+    Слои сразу уменьшаются до итогового размера, и наложение идёт уже на 512x512
+    """
+    layers = {}
+    for path in IMAGES_DIR.glob("*.png"):
+        with Image.open(path) as img:
+            size = (round(img.width * COMPRESS_SCALE), round(img.height * COMPRESS_SCALE))
+            layers[path.stem] = img.convert("RGBA").resize(size, Image.Resampling.LANCZOS)
+    return layers
+
+
+# Слои в памяти: сборка картинки не читает диск и не декодирует PNG
+LAYERS = _load_layers()
+
+# Имя параметра -> слой в LAYERS
+ACTION_LAYERS = {
+    "food": "Food",
+    "game": "Game",
+    "sleep": "CatLowEnergy",
+}
+ACCESSORY_LAYERS = {
+    "finance": "AcsFinance",
+    "gaming": "AcsGaming",
+    "weather": "AcsWeather",
+}
+# Порядок словаря задаёт порядок наложения иконок
+ICON_LAYERS = {
+    "satiety": "SatietyIcon",
+    "energy": "EnergyIcon",
+    "mood": "MoodIcon",
+}
+
 
 def composite_cat_image(
     state_icons: list = None,
@@ -29,54 +69,37 @@ def composite_cat_image(
     Returns:
         BytesIO с готовым PNG
     """
-    
-    # Загружаем базовое изображение кота
-    cat_img = Image.open(IMAGES_DIR / "Cat.png").convert("RGBA")
+    # Вариантов мало (8 наборов иконок × 4 аксессуара + 3 действия × 4),
+    # поэтому готовые байты кэшируются, а вызывающему каждый раз отдаётся свой BytesIO.
+    # Иконки приводятся к каноническому порядку: {mood, satiety} и [satiety, mood]
+    # дают одну и ту же картинку и один ключ
+    icons = set(state_icons or ())
+    key = tuple(icon for icon in ICON_LAYERS if icon in icons)
+    return io.BytesIO(_composite_bytes(key, action_layer, accessory))
+
+
+@lru_cache(maxsize=64)
+def _composite_bytes(state_icons: tuple, action_layer: str, accessory: str) -> bytes:
+    """Собирает и кодирует композитное изображение (результат кэшируется)"""
+    # Базовое изображение кота (alpha_composite возвращает новый объект — LAYERS не меняется)
+    cat_img = LAYERS["Cat"]
     
     # Наложение слоя действия (сверху)
-    if action_layer:
-        action_map = {
-            "food": IMAGES_DIR / "Food.png",
-            "game": IMAGES_DIR / "Game.png",
-            "sleep": IMAGES_DIR / "CatLowEnergy.png",
-        }
-        if action_layer in action_map:
-            action_img = Image.open(action_map[action_layer]).convert("RGBA")
-            cat_img = Image.alpha_composite(cat_img, action_img)
+    if action_layer in ACTION_LAYERS:
+        cat_img = Image.alpha_composite(cat_img, LAYERS[ACTION_LAYERS[action_layer]])
 
     # Наложение аксессуара
-    if accessory:
-        accessory_map = {
-            "finance": IMAGES_DIR / "AcsFinance.png",
-            "gaming": IMAGES_DIR / "AcsGaming.png",
-            "weather": IMAGES_DIR / "AcsWeather.png",
-        }
-        if accessory in accessory_map:
-            acc_img = Image.open(accessory_map[accessory]).convert("RGBA")
-            cat_img = Image.alpha_composite(cat_img, acc_img)
-    
-    # Наложение иконок состояния
-    if state_icons:
-        icon_map = {
-            "energy": IMAGES_DIR / "EnergyIcon.png",
-            "mood": IMAGES_DIR / "MoodIcon.png",
-            "satiety": IMAGES_DIR / "SatietyIcon.png",
-        }
-        for icon_key in state_icons:
-            if icon_key in icon_map:
-                icon_img = Image.open(icon_map[icon_key]).convert("RGBA")
-                cat_img = Image.alpha_composite(cat_img, icon_img)
+    if accessory in ACCESSORY_LAYERS:
+        cat_img = Image.alpha_composite(cat_img, LAYERS[ACCESSORY_LAYERS[accessory]])
     
-    # Оптимизация размера для Telegram
-    new_size = (COMPRESS_SCALE * cat_img.width, COMPRESS_SCALE * cat_img.height)
-    cat_img.thumbnail((512, 512), Image.Resampling.LANCZOS)
+    # Наложение иконок состояния (state_icons уже в порядке ICON_LAYERS)
+    for icon_key in state_icons:
+        cat_img = Image.alpha_composite(cat_img, LAYERS[ICON_LAYERS[icon_key]])
     
     # Сохраняем в BytesIO
     output = io.BytesIO()
-    cat_img.save(output, format="PNG", optimize=True)
-    output.seek(0)
-    
-    return output
+    cat_img.save(output, **SAVE_PARAMS)
+    return output.getvalue()
 
 
 def get_status_image(
@@ -19,24 +19,37 @@ tasks.py — фоновые задачи для бота (периодическ
 import asyncio
 import logging
 import sqlite3
-import json
-from datetime import datetime
-from pathlib import Path
+import threading
+import time
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 logger = logging.getLogger(__name__)
 
 
-def get_db_connection():
-    """Получает подключение к БД"""
-    conn = sqlite3.connect("pets.db")
-    conn.row_factory = sqlite3.Row
-    return conn
+# Настройки подключения: journal_mode=WAL сохраняется в файле БД,
+# остальные действуют только на само подключение
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
 
+# Одно подключение на поток: задачи ходят в БД из потоков asyncio.to_thread,
+# а sqlite3-подключение нельзя делить между потоками
+_local = threading.local()
 
-def clamp(value: int, lo: int = 0, hi: int = 100) -> int:
-    """Ограничивает значение в диапазоне"""
-    return max(lo, min(hi, value))
+
+def get_db_connection():
+    """Получает подключение к БД текущего потока (открывается один раз)"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect("pets.db")
+        conn.row_factory = sqlite3.Row
+        for pragma in DB_PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
+    return conn
 
 
 def ensure_warn_columns():
@@ -46,121 +59,162 @@ def ensure_warn_columns():
     """
     conn = get_db_connection()
     cur = conn.cursor()
-    try:
+    with conn:
         for col in ("warned_satiety", "warned_mood", "warned_energy"):
             try:
                 cur.execute(f"ALTER TABLE pets ADD COLUMN {col} INTEGER DEFAULT 0")
-                conn.commit()
                 logger.info(f"Добавлена колонка {col}")
             except sqlite3.OperationalError:
                 pass  # колонка уже существует
-    finally:
-        conn.close()
 
 
-def set_warned_flags(user_id: str, **flags):
-    """
-    Обновляет флаги предупреждений для пользователя.
-    Пример: set_warned_flags(user_id, warned_satiety=1, warned_mood=0)
-    """
-    if not flags:
-        return
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        set_clause = ", ".join(f"{k} = ?" for k in flags)
-        values = list(flags.values()) + [user_id]
-        cur.execute(f"UPDATE pets SET {set_clause} WHERE user_id = ?", values)
-        conn.commit()
-    finally:
-        conn.close()
+_WARN_FLAGS = ("warned_satiety", "warned_mood", "warned_energy")
 
 
-def apply_hourly_decay(user_id: str):
+def set_warned_flags_many(updates: list) -> int:
     """
-    Применяет почасовой спад:
-    - Сытость: -10
-    - Настроение: -5
+    Обновляет флаги предупреждений многих пользователей одним executemany и одним commit.
+    updates: [(user_id, {"warned_satiety": 1, ...}), ...]; не указанные флаги не меняются
     """
+    rows = [
+        (*(flags.get(col) for col in _WARN_FLAGS), user_id)
+        for user_id, flags in updates if flags
+    ]
+    if not rows:
+        return 0
     conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT satiety, mood FROM pets WHERE user_id = ?", (user_id,))
-        row = cur.fetchone()
-        if not row:
-            return None
-        
-        new_satiety = clamp(row["satiety"] - 10)
-        new_mood = clamp(row["mood"] - 5)
-        
-        cur.execute("""
-            UPDATE pets SET satiety = ?, mood = ?, last_satiety_check = ?
+    with conn:
+        conn.executemany("""
+            UPDATE pets SET
+                warned_satiety = COALESCE(?, warned_satiety),
+                warned_mood    = COALESCE(?, warned_mood),
+                warned_energy  = COALESCE(?, warned_energy)
             WHERE user_id = ?
-        """, (new_satiety, new_mood, datetime.now().isoformat(), user_id))
-        conn.commit()
-        
-        cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-        return dict(cur.fetchone())
-    finally:
-        conn.close()
+        """, rows)
+    return len(rows)
 
 
-def apply_energy_recovery(user_id: str):
+def bulk_hourly_decay() -> list:
     """
-    Восстанавливает энергию: 10 * (сытость / 100)
-    Работает каждые 30 минут
+    Почасовой спад сразу у всех питомцев одним UPDATE в одной транзакции.
+    Возвращает только строки, которым нужно уведомление или сброс флага warned_*
     """
     conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT energy, satiety FROM pets WHERE user_id = ?", (user_id,))
-        row = cur.fetchone()
-        if not row:
-            return None
-        
-        recovery = int(10 * (row["satiety"] / 100))
-        if recovery < 1:
-            recovery = 1
-        
-        new_energy = min(100, row["energy"] + recovery)
-        
-        cur.execute("""
-            UPDATE pets SET energy = ?, last_energy_check = ?
-            WHERE user_id = ?
-        """, (new_energy, datetime.now().isoformat(), user_id))
-        conn.commit()
-        
-        cur.execute("SELECT * FROM pets WHERE user_id = ?", (user_id,))
-        return dict(cur.fetchone())
-    finally:
-        conn.close()
+    with conn:
+        conn.execute("""
+            UPDATE pets SET
+                satiety = MAX(0, MIN(100, satiety - 10)),
+                mood    = MAX(0, MIN(100, mood - 5)),
+                last_satiety_check = ?
+        """, (int(time.time()),))
+        return conn.execute("""
+            SELECT user_id, name, satiety, mood, warned_satiety, warned_mood
+            FROM pets
+            WHERE (satiety = 0 AND NOT COALESCE(warned_satiety, 0))
+               OR (satiety > 0 AND COALESCE(warned_satiety, 0))
+               OR (mood = 0 AND NOT COALESCE(warned_mood, 0))
+               OR (mood > 0 AND COALESCE(warned_mood, 0))
+        """).fetchall()
+
+
+def bulk_energy_recovery() -> int:
+    """
+    Восстановление энергии сразу у всех питомцев: 10 * (сытость / 100), минимум 1.
+    Возвращает число обновлённых строк
+    """
+    conn = get_db_connection()
+    with conn:
+        cur = conn.execute("""
+            UPDATE pets SET
+                energy = MIN(100, energy + MAX(1, 10 * satiety / 100)),
+                last_energy_check = ?
+        """, (int(time.time()),))
+        return cur.rowcount
+
+
+# Питомцы с низкими показателями. UNION вместо OR: каждая ветка читает свой
+# частичный индекс idx_pets_low_* (создаются в init_db бота), а не всю таблицу
+_SQL_LOW_STAT_IDS = """
+    SELECT user_id FROM pets WHERE satiety < 30
+    UNION
+    SELECT user_id FROM pets WHERE energy < 20
+    UNION
+    SELECT user_id FROM pets WHERE mood < 30
+"""
 
 
-def get_all_users() -> list:
-    """Получить список всех user_id"""
+def claim_low_stat_alerts() -> list:
+    """
+    Решает, кому нужно напоминание о низких показателях, прямо в SQLite.
+    Флаг warned_* у питомца с низкими показателями равен 1, пока показатель в (0, порог],
+    и сбрасывается в 0, когда он вышел из этого диапазона.
+    Возвращает только строки с новым предупреждением; alert_* = 1 у показателей,
+    о которых ещё не напоминали. Флаги обновляются в той же транзакции
+    """
     conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT user_id FROM pets")
-        return [row["user_id"] for row in cur.fetchall()]
-    finally:
-        conn.close()
+    with conn:
+        # IMMEDIATE: бот не успеет изменить показатели между выборкой и UPDATE'ом флагов
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(f"""
+            SELECT * FROM (
+                SELECT user_id, name, satiety, energy, mood,
+                       satiety BETWEEN 1 AND 30 AND NOT COALESCE(warned_satiety, 0) AS alert_satiety,
+                       mood BETWEEN 1 AND 30 AND NOT COALESCE(warned_mood, 0) AS alert_mood,
+                       energy BETWEEN 1 AND 20 AND NOT COALESCE(warned_energy, 0) AS alert_energy
+                FROM pets WHERE user_id IN ({_SQL_LOW_STAT_IDS})
+            ) WHERE alert_satiety OR alert_mood OR alert_energy
+        """).fetchall()
+        conn.execute(f"""
+            UPDATE pets SET
+                warned_satiety = satiety BETWEEN 1 AND 30,
+                warned_mood    = mood BETWEEN 1 AND 30,
+                warned_energy  = energy BETWEEN 1 AND 20
+            WHERE user_id IN ({_SQL_LOW_STAT_IDS})
+              AND (COALESCE(warned_satiety, 0) != (satiety BETWEEN 1 AND 30)
+                OR COALESCE(warned_mood, 0)    != (mood BETWEEN 1 AND 30)
+                OR COALESCE(warned_energy, 0)  != (energy BETWEEN 1 AND 20))
+        """)
+    return rows
+
+
+# ── Рассылка уведомлений ───────────────────────────────────────────────────────
+
+# Сколько send_message идёт одновременно и сколько сообщений в секунду
+# допускает Telegram для рассылки разным чатам
+NOTIFY_CONCURRENCY = 8
+NOTIFY_RATE = 30
+
+
+async def send_notifications(bot, messages: list):
+    """
+    Рассылает [(user_id, text, kb), ...] параллельно: сетевые задержки перекрываются,
+    а старты отправок разнесены так, чтобы не превышать NOTIFY_RATE сообщений в секунду.
+    """
+    sem = asyncio.Semaphore(NOTIFY_CONCURRENCY)
 
+    async def send(i: int, user_id: str, text: str, kb):
+        await asyncio.sleep(i / NOTIFY_RATE)
+        async with sem:
+            try:
+                await bot.send_message(int(user_id), text, reply_markup=kb)
+            except Exception as e:
+                logger.warning(f"Не удалось отправить уведомление {user_id}: {e}")
 
-def get_users_with_low_stat(stat: str, threshold: int) -> list:
-    """Получить user_id у кого низкий показатель"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        query = f"SELECT user_id FROM pets WHERE {stat} < ?"
-        cur.execute(query, (threshold,))
-        return [row["user_id"] for row in cur.fetchall()]
-    finally:
-        conn.close()
+    await asyncio.gather(*(send(i, *msg) for i, msg in enumerate(messages)))
 
 
 # ── Фоновые задачи ─────────────────────────────────────────────────────────────
 
+# Вызывается после каждой записи в pets из фоновых задач: бот сбрасывает
+# свой кэш строк питомцев (задачи работают в его event loop)
+_on_pets_changed = None
+
+
+def _pets_changed():
+    if _on_pets_changed is not None:
+        _on_pets_changed()
+
+
 async def task_hourly_decay(bot):
     """
     Задача: каждый час снижает сытость (-10) и настроение (-5) всем питомцам.
@@ -170,13 +224,18 @@ async def task_hourly_decay(bot):
     while True:
         await asyncio.sleep(3600)  # 1 час ---> 3600 секунд
         logger.info("⏰ [hourly_decay] Применяю почасовой спад...")
-        users = get_all_users()
-        for user_id in users:
+        try:
+            rows = await asyncio.to_thread(bulk_hourly_decay)
+        except Exception as e:
+            logger.error(f"[hourly_decay] Ошибка спада: {e}")
+            continue
+        _pets_changed()
+        flag_batch = []
+        notifications = []
+        for row in rows:
+            user_id = row["user_id"]
+            pet = dict(row)
             try:
-                pet = apply_hourly_decay(user_id)
-                if not pet:
-                    continue
-
                 warnings = []
                 kb = InlineKeyboardMarkup()
                 flag_updates = {}
@@ -198,18 +257,21 @@ async def task_hourly_decay(bot):
                 elif pet["mood"] > 0 and pet.get("warned_mood"):
                     flag_updates["warned_mood"] = 0
 
-                # Сохраняем изменённые флаги
+                # Изменённые флаги сохраняются одной пачкой после цикла
                 if flag_updates:
-                    set_warned_flags(user_id, **flag_updates)
+                    flag_batch.append((user_id, flag_updates))
 
                 if warnings:
                     text = f"⚠️ <b>{pet['name']}</b> нуждается в вашем внимании!\n\n" + "\n".join(warnings)
-                    try:
-                        await bot.send_message(int(user_id), text, reply_markup=kb)
-                    except Exception as e:
-                        logger.warning(f"Не удалось отправить уведомление {user_id}: {e}")
+                    notifications.append((user_id, text, kb))
             except Exception as e:
                 logger.error(f"[hourly_decay] Ошибка для {user_id}: {e}")
+        try:
+            await asyncio.to_thread(set_warned_flags_many, flag_batch)
+        except Exception as e:
+            logger.error(f"[hourly_decay] Не удалось сохранить флаги: {e}")
+        _pets_changed()
+        await send_notifications(bot, notifications)
 
 
 async def task_energy_recovery(bot):
@@ -220,12 +282,12 @@ async def task_energy_recovery(bot):
     while True:
         await asyncio.sleep(1800)  # 30 минут ---> 1800 cекунд
         logger.info("⚡ [energy_recovery] Восстанавливаю энергию...")
-        users = get_all_users()
-        for user_id in users:
-            try:
-                apply_energy_recovery(user_id)
-            except Exception as e:
-                logger.error(f"[energy_recovery] Ошибка для {user_id}: {e}")
+        try:
+            await asyncio.to_thread(bulk_energy_recovery)
+        except Exception as e:
+            logger.error(f"[energy_recovery] Ошибка восстановления: {e}")
+            continue
+        _pets_changed()
 
 
 async def task_check_low_stats(bot):
@@ -237,91 +299,56 @@ async def task_check_low_stats(bot):
         await asyncio.sleep(7200)  # 2 часа ---> 7200 секунд
         logger.info("🔍 [check_low_stats] Проверяю низкие показатели...")
 
-        conn = get_db_connection()
-        cur = conn.cursor()
         try:
-            cur.execute("""
-                SELECT user_id, name, satiety, energy, mood,
-                       warned_satiety, warned_mood, warned_energy
-                FROM pets
-                WHERE satiety < 30 OR energy < 20 OR mood < 30
-            """)
-            rows = cur.fetchall()
-        finally:
-            conn.close()
+            rows = await asyncio.to_thread(claim_low_stat_alerts)
+        except Exception as e:
+            logger.error(f"[check_low_stats] Ошибка проверки: {e}")
+            continue
+        _pets_changed()
+        notifications = []
 
         for row in rows:
-            user_id = row["user_id"]
-            pet = dict(row)
             alerts = []
             kb = InlineKeyboardMarkup()
-            flag_updates = {}
 
-            # ── Сытость ──────────────────────────────────────────────────────
-            if 0 < pet["satiety"] <= 30:
-                if not pet.get("warned_satiety"):
-                    alerts.append(f"🍖 Сытость: {pet['satiety']}/100 — ГОЛОДАЕТ!")
-                    kb.add(InlineKeyboardButton("🍖 Покормить", callback_data="feed"))
-                    flag_updates["warned_satiety"] = 1
-            else:
-                # Выше порога — сбрасываем флаг чтобы следующее падение снова триггернуло
-                if pet.get("warned_satiety"):
-                    flag_updates["warned_satiety"] = 0
+            # Флаги warned_* уже выставлены в claim_low_stat_alerts
+            if row["alert_satiety"]:
+                alerts.append(f"🍖 Сытость: {row['satiety']}/100 — ГОЛОДАЕТ!")
+                kb.add(InlineKeyboardButton("🍖 Покормить", callback_data="feed"))
+            if row["alert_mood"]:
+                alerts.append(f"😟 Настроение: {row['mood']}/100 — ГРУСТИТ!")
+                kb.add(InlineKeyboardButton("🎮 Поиграть", callback_data="play"))
+            if row["alert_energy"]:
+                alerts.append(f"⚡ Энергия: {row['energy']}/100 — УСТАЛ!")
 
-            # ── Настроение ───────────────────────────────────────────────────
-            if 0 < pet["mood"] <= 30:
-                if not pet.get("warned_mood"):
-                    alerts.append(f"😟 Настроение: {pet['mood']}/100 — ГРУСТИТ!")
-                    kb.add(InlineKeyboardButton("🎮 Поиграть", callback_data="play"))
-                    flag_updates["warned_mood"] = 1
-            else:
-                if pet.get("warned_mood"):
-                    flag_updates["warned_mood"] = 0
-
-            # ── Энергия ──────────────────────────────────────────────────────
-            if 0 < pet["energy"] <= 20:
-                if not pet.get("warned_energy"):
-                    alerts.append(f"⚡ Энергия: {pet['energy']}/100 — УСТАЛ!")
-                    flag_updates["warned_energy"] = 1
-            else:
-                if pet.get("warned_energy"):
-                    flag_updates["warned_energy"] = 0
+            text = f"⚠️ <b>{row['name']}</b> не в порядке!\n\n" + "\n".join(alerts)
+            notifications.append((row["user_id"], text, kb))
+        await send_notifications(bot, notifications)
 
-            # Сохраняем изменённые флаги
-            if flag_updates:
-                set_warned_flags(user_id, **flag_updates)
 
-            if alerts:
-                text = f"⚠️ <b>{pet['name']}</b> не в порядке!\n\n" + "\n".join(alerts)
-                try:
-                    await bot.send_message(int(user_id), text, reply_markup=kb)
-                except Exception as e:
-                    logger.warning(f"Не удалось отправить уведомление {user_id}: {e}")
+# Ссылки на запущенные задачи, чтобы их не собрал сборщик мусора
+_background_tasks: list = []
 
 
-def start_background_tasks(bot):
+def start_background_tasks(bot, on_pets_changed=None):
     """
-    Запускает все фоновые задачи в отдельных потоках через asyncio.
-    Вызывается из bot.py перед запуском polling.
+    Запускает все фоновые задачи в event loop бота.
+    Вызывается из main() в bot.py перед запуском polling.
+    AsyncTeleBot держит aiohttp-сессию в своём loop, поэтому задачи работают
+    в нём же, а синхронные запросы к БД уходят в пул потоков (asyncio.to_thread).
+    on_pets_changed() вызывается после каждой массовой записи в pets.
     """
-    import threading
-
+    global _on_pets_changed
+    _on_pets_changed = on_pets_changed
     # Убеждаемся, что колонки warned_* существуют в БД
     ensure_warn_columns()
 
-    def run_task(coro_factory):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(coro_factory())
-
+    loop = asyncio.get_running_loop()
     tasks = [
-        lambda: task_hourly_decay(bot),
-        lambda: task_energy_recovery(bot),
-        lambda: task_check_low_stats(bot),
+        (task_hourly_decay(bot), "hourly_decay"),
+        (task_energy_recovery(bot), "energy_recovery"),
+        (task_check_low_stats(bot), "check_low_stats"),
     ]
-
-    task_names = ["hourly_decay", "energy_recovery", "check_low_stats"]
-    for task, name in zip(tasks, task_names):
-        t = threading.Thread(target=run_task, args=(task,), daemon=True, name=name)
-        t.start()
+    for coro, name in tasks:
+        _background_tasks.append(loop.create_task(coro, name=name))
         logger.info(f"✅ Фоновая задача запущена: {name}")